@@ -0,0 +1,248 @@
+'''
+Benchmark of the data models in metDataModel.core and metDataModel.core_simple.
+
+For every class and each scale (number of objects), objects are filled with fixed payloads 
+of typical size (e.g. a Peak of 20 scans, a MassTrack of 50 scans, an EmpiricalCompound of 3 features), see payloads,
+and the benchmark measures
+    construction time, serialize time, deserialize time (core only), 
+    JSON round-trip time (json.dumps + json.loads [+ deserialize for core]),
+    and memory per object (tracemalloc, bytes).
+Times are seconds for all objects at that scale.
+
+Results are written as JSON, with package version and platform, so that releases can be compared:
+    python benchmarks/benchmark_models.py --scales 1000,100000,1000000 -o bench_0.6.1.json
+    python benchmarks/benchmark_models.py -o bench_new.json --compare bench_0.6.1.json
+'''
+
+import argparse
+import gc
+import inspect
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+# run from a source checkout without installing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metDataModel
+from metDataModel import core, core_simple, convert
+
+# core_simple.Sample requires a registry
+simple_constructor_args = {
+    'Sample': {'registry': {'input_file': '', 'name': '', 'sample_id': '', 'list_retention_time': []}},
+}
+
+
+def _series(number, start, step, ii):
+    return [round(start + step * (jj + ii % 7), 4) for jj in range(number)]
+
+def _elution(number, ii):
+    '''Retention times and a peak shaped intensity profile of number scans.'''
+    return _series(number, 100 + ii % 500, 0.4, ii), [round(1e5 * (1 + jj * (number - jj)) / number ** 2 + ii % 13, 2) 
+                                                      for jj in range(number)]
+
+def _peak(ii):
+    rtimes, intensities = _elution(20, ii)
+    mz = 100 + (ii % 90000) * 0.01
+    return {'id': 'P%d' %ii, 'mode': 'pos', 'sample': 'sample_%d' %(ii % 100), 'mz': mz, 'min_mz': mz - 0.002, 
+            'max_mz': mz + 0.002, 'rtime': rtimes[10], 'min_ritme': rtimes[0], 'max_rtime': rtimes[-1],
+            'list_mz': [mz] * 20, 'list_retention_time': rtimes, 'list_intensity': intensities}
+
+def _masstrack(ii):
+    rtimes, intensities = _elution(50, ii)
+    return {'id': 'T%d' %ii, 'mz': 100 + (ii % 90000) * 0.01, 'list_retention_time': rtimes, 'list_intensity': intensities}
+
+def _feature(ii):
+    return {'id': 'F%d' %ii, 'mz': 100 + (ii % 90000) * 0.01, 'rtime': 100 + ii % 500, 'parent_masstrack_id': 'T%d' %ii, 
+            'left_base': 95 + ii % 500, 'right_base': 105 + ii % 500, 'height': 1e5 + ii, 'peak_area': 2e6 + ii, 
+            'goodness_fitting': 0.93, 'snr': 120, 'experiment_belonged': 'EXP1',
+            'list_peaks': ['P%d_%d' %(ii, jj) for jj in range(10)], 'statistics': {'CV_QC': 0.12, 'detection_rate': 0.9}}
+
+def _empCpd(ii):
+    mass = 100 + (ii % 90000) * 0.01
+    spectra = [{'id': 'F%d' %(3 * ii + jj), 'mz': mass + 1.007276 + jj * 1.003355, 'rtime': 100 + ii % 500, 
+                'ion_relation': ion} for jj, ion in enumerate(['M0,M+H+', '13C/12C,M+H+', '13C/12C*2,M+H+'])]
+    return {'id': 'E%d' %ii, 'interim_id': 'E%d' %ii, 'experiment_belonged': 'EXP1', 'neutral_base_mass': mass, 
+            'neutral_formula': 'C6H12O6', 'neutral_formula_mass': mass, 'annotation_method': 'khipu',
+            'MS1_pseudo_Spectra': spectra, 'list_features': [x['id'] for x in spectra],
+            'identity': [['C6H12O6', 0.8]], 'annotation': {'HMDB': ['HMDB0000122']}}
+
+def _spectrum(ii):
+    precursor = 200 + (ii % 80000) * 0.01
+    return {'id': 'MS2_%d' %ii, 'ms_level': 2, 'ionization': 'pos', 'precursor_ion_mz': precursor, 'rtime': 100 + ii % 500,
+            'list_mz': _series(30, 50, (precursor - 50) / 30, ii), 'list_intensity': _series(30, 1, 3.3, ii)}
+
+def _compound(ii):
+    return {'id': 'HMDB%07d' %ii, 'name': 'compound %d' %ii, 'db_ids': [['HMDB', 'HMDB%07d' %ii], ['KEGG', 'C%05d' %ii]],
+            'neutral_formula': 'C6H12O6', 'neutral_mono_mass': 180.06339, 'charge': 0, 'charged_formula': 'C6H12O6',
+            'SMILES': 'OC[C@H]1OC(O)[C@H](O)[C@@H](O)[C@@H]1O', 
+            'inchi': 'InChI=1S/C6H12O6/c7-1-2-3(8)4(9)5(10)6(11)12-2/h2-11H,1H2/t2-,3-,4+,5-,6?/m1/s1'}
+
+def _sample(ii):
+    return {'id': 'sample_%d' %ii, 'name': 'sample_%d' %ii, 'input_file': 'sample_%d.mzML' %ii, 'mode': 'pos', 
+            'sample_type': 'study_sample', 'experiment': 'EXP1', 'list_retention_time': _series(200, 0, 3, ii),
+            'batch': 'batch_%d' %(ii // 100), 'injection_order': ii}
+
+def _experiment(ii):
+    return {'id': 'EXP%d' %ii, 'parent_study': 'ST%d' %ii, 'number_samples': 100, 'species': 'Homo sapiens', 
+            'tissue': 'plasma', 'chromatography': {'method_file': 'HILIC_pos.meth', 'column_model': 'HILIC'}, 
+            'instrumentation': {'ionization': 'pos', 'mass_resolution': 120000},
+            'ordered_samples': ['sample_%d' %jj for jj in range(100)], 
+            'List_of_empCpds': ['E%d' %jj for jj in range(100)]}
+
+def _reaction(ii):
+    return {'id': 'R%d' %ii, 'name': 'reaction %d' %ii, 'source': ['MetaNetX'], 'reactants': ['C00031', 'C00002'],
+            'products': ['C00092', 'C00008'], 'enzymes': ['2.7.1.1'], 'genes': ['HK1', 'HK2'], 'pathways': ['glycolysis']}
+
+# per class, a function of object index returning field values by core field name
+payloads = {
+    'Peak': _peak,
+    'MassTrack': _masstrack,
+    'Feature': _feature,
+    'EmpiricalCompound': _empCpd,
+    'Spectrum': _spectrum,
+    'Compound': _compound,
+    'Sample': _sample,
+    'Experiment': _experiment,
+    'Reaction': _reaction,
+    'Pathway': lambda ii: {'id': 'PW%d' %ii, 'name': 'pathway %d' %ii, 'source': ['KEGG'], 
+                           'list_of_reactions': ['R%d' %(ii + jj) for jj in range(20)]},
+    'Gene': lambda ii: {'id': 'G%d' %ii, 'name': 'hexokinase 1', 'symbol': 'HK1', 'ensembl_id': 'ENSG00000156515',
+                        'linked_metabolites': ['C00031', 'C00092'], 'linked_diseases': ['hemolytic anemia']},
+    'Network': lambda ii: {'id': 'N%d' %ii, 'name': 'network %d' %ii, 'source': ['Recon3D'], 
+                           'list_of_reactions': ['R%d' %(ii + jj) for jj in range(50)]},
+    'MetabolicModel': lambda ii: {'id': 'M%d' %ii, 'meta_data': {'species': 'Homo sapiens', 'version': '1.0'},
+                                  'list_of_reactions': ['R%d' %jj for jj in range(50)], 
+                                  'list_of_pathways': ['PW%d' %jj for jj in range(10)],
+                                  'list_of_compounds': ['C%05d' %jj for jj in range(50)]},
+    'Study': lambda ii: {'id': 'ST%d' %ii, 'url': 'https://www.metabolomicsworkbench.org/ST%06d' %ii, 
+                         'time_retrieval': '2024-01-01'},
+    'Method': lambda ii: {'id': 'METHOD%d' %ii, 'citation': 'doi:10.1000/method.%d' %ii, 
+                          'chromatography': {'method_file': 'HILIC_pos.meth', 'column_model': 'HILIC'},
+                          'instrumentation': {'ionization': 'pos', 'mass_resolution': 120000}},
+    'ArrayOfSpectra': lambda ii: {'id': 'A%d' %ii, 'sample': 'sample_%d' %(ii % 100), 'parameters': {'mz_tolerance_ppm': 5},
+                                  'list_values': [_series(30, 100, 0.5, ii)]},
+    'Enzyme': lambda ii: {'id': 'EC%d' %ii, 'name': 'hexokinase', 'ec_num': '2.7.1.1', 'genes': ['HK1', 'HK2'], 
+                          'reactions': ['R%d' %ii]},
+}
+
+
+def _constructor(module_name, cls):
+    '''
+    Return a function of a payload creating one object. core objects take fields as arguments;
+    core_simple objects are constructed with defaults and payload fields set as attributes, by core_simple names.
+    '''
+    if module_name == 'core':
+        return lambda payload: cls(**payload)
+    kwargs = simple_constructor_args.get(cls.__name__, {})
+    attributes = set(vars(cls(**kwargs)))
+    renames = {v: k for k, v in convert.field_renames.get(cls.__name__, {}).items()}
+    def construct(payload):
+        obj = cls(**kwargs)
+        for name, value in payload.items():
+            name = renames.get(name, name)
+            if name in attributes:
+                setattr(obj, name, value)
+        return obj
+    return construct
+
+
+def get_classes():
+    '''
+    All classes defined in core (metDataMember subclasses) and core_simple, as (module name, class).
+    '''
+    classes = [('core', c) for _, c in inspect.getmembers(core, inspect.isclass) 
+               if issubclass(c, core.metDataMember) and c is not core.metDataMember and c.__module__ == core.__name__]
+    classes += [('core_simple', c) for _, c in inspect.getmembers(core_simple, inspect.isclass) 
+                if c.__module__ == core_simple.__name__]
+    return classes
+
+
+def _timed(function, *args):
+    gc.collect()
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def benchmark_class(module_name, cls, number):
+    '''
+    Construction is timed from prepared payloads; memory includes the payload values held by the objects.
+    Classes without a payload are constructed empty.
+    '''
+    construct = _constructor(module_name, cls)
+    make_payload = payloads.get(cls.__name__, lambda ii: {})
+    result = {'module': module_name, 'class': cls.__name__, 'number': number}
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    prepared = [make_payload(ii) for ii in range(number)]
+    result['construct_seconds'], objects = _timed(lambda payloads: [construct(x) for x in payloads], prepared)
+    del prepared
+    result['memory_bytes_per_object'] = (tracemalloc.get_traced_memory()[0] - before) / number
+    tracemalloc.stop()
+
+    result['serialize_seconds'], serialized = _timed(lambda: [x.serialize() for x in objects])
+    if module_name == 'core':
+        result['deserialize_seconds'], _ = _timed(lambda: [core.metDataMember.deserialize(x) for x in serialized])
+        round_trip = lambda: [core.metDataMember.deserialize(json.loads(json.dumps(x.serialize()))) for x in objects]
+    else:
+        result['deserialize_seconds'] = None
+        round_trip = lambda: [json.loads(json.dumps(x.serialize())) for x in objects]
+    result['JSON_round_trip_seconds'], _ = _timed(round_trip)
+    return result
+
+
+def compare(results, previous):
+    '''
+    Print ratio of current to previous times for matching (module, class, number).
+    '''
+    previous = {(r['module'], r['class'], r['number']): r for r in previous['results']}
+    for r in results:
+        p = previous.get((r['module'], r['class'], r['number']))
+        if not p:
+            continue
+        ratios = ['%s x%.2f' %(k.replace('_seconds', ''), r[k] / p[k]) 
+                  for k in r if k.endswith('_seconds') and r[k] and p.get(k)]
+        print('%s.%s (%d): %s' %(r['module'], r['class'], r['number'], ', '.join(ratios)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark metDataModel core and core_simple classes.')
+    parser.add_argument('--scales', default='1000,100000,1000000', help='comma separated numbers of objects')
+    parser.add_argument('--classes', default='', help='comma separated class names, default all')
+    parser.add_argument('-o', '--output', default='bench_output.json', help='JSON file to write results')
+    parser.add_argument('--compare', default='', help='previous results JSON file to compare with')
+    args = parser.parse_args()
+
+    selected = set(args.classes.split(',')) if args.classes else None
+    results = []
+    for number in [int(x) for x in args.scales.split(',')]:
+        for module_name, cls in get_classes():
+            if selected and cls.__name__ not in selected:
+                continue
+            r = benchmark_class(module_name, cls, number)
+            print('%s.%s (%d): construct %.3fs, serialize %.3fs, deserialize %s, JSON round trip %.3fs, %.0f bytes/object' %(
+                module_name, cls.__name__, number, r['construct_seconds'], r['serialize_seconds'],
+                '%.3fs' %r['deserialize_seconds'] if r['deserialize_seconds'] is not None else '-', 
+                r['JSON_round_trip_seconds'], r['memory_bytes_per_object']))
+            results.append(r)
+
+    with open(args.output, 'w') as O:
+        json.dump({
+            'metDataModel_version': metDataModel.__version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'results': results,
+        }, O, indent=2)
+    if args.compare:
+        with open(args.compare) as O:
+            compare(results, json.load(O))
+
+
+if __name__ == '__main__':
+    main()
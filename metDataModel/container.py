@@ -0,0 +1,202 @@
+'''
+Single-file container of serialized metDataMember objects, for random access in large archives.
+
+Objects are serialized to JSON and stored in zlib-compressed blocks. 
+An index of object id to (block, position) and of m/z per object is kept at the end of the file, 
+so that reading objects by id or by m/z range decompresses only the blocks needed.
+Each append sorts its objects by m/z, so that blocks cover narrow m/z ranges.
+Ids are indexed as str, as JSON object keys are, so that e.g. Feature(id=5) is found by get(5) after reopening.
+Appending writes new blocks after the existing index and trailer, and a new index and trailer at close.
+The old index is left as dead space, so that if the process stops before close,
+the container still opens with its previous contents, from the last complete trailer.
+
+File layout:
+    MAGIC, block, block, ..., compressed JSON index, 8-byte index offset, MAGIC
+
+Example:
+    with ObjectContainer('empCpds.mdmc', 'w') as C:
+        C.append(list_empCpds)
+    with ObjectContainer('empCpds.mdmc') as C:
+        empCpd = C.get('kp1832_268.0808')
+        empCpds = C.query_mz(268.0, 268.1)
+'''
+
+import bisect
+import json
+import struct
+import zlib
+
+from metDataModel.core import metDataMember
+
+MAGIC = b'MDMC0001'
+
+
+def default_mz(member):
+    '''
+    m/z used to index a member: mz, e.g. of Feature or Peak, else neutral_base_mass, e.g. of EmpiricalCompound.
+    '''
+    mz = getattr(member, 'mz', None)
+    if mz is None:
+        mz = getattr(member, 'neutral_base_mass', None)
+    return mz
+
+
+class ObjectContainer:
+    '''
+    Random-access container of metDataMember objects. mode is 'r' (read), 'w' (new file) or 'a' (append).
+    '''
+    def __init__(self, path, mode='r', block_size=256, compression_level=6, mz_key=default_mz):
+        self.path, self.mode = path, mode
+        self.block_size, self.compression_level, self.mz_key = block_size, compression_level, mz_key
+        # blocks: [offset, length, min_mz, max_mz]; objects: str(id) -> [block, position, mz]
+        self.blocks, self.objects = [], {}
+        if mode == 'w':
+            self.file = open(path, 'w+b')
+            self.file.write(MAGIC)
+            self.data_end = len(MAGIC)
+        elif mode in ('r', 'a'):
+            self.file = open(path, 'rb' if mode == 'r' else 'r+b')
+            self._read_index()
+        else:
+            raise ValueError("Unknown mode %s, use 'r', 'w' or 'a'." %mode)
+        self._block_cache = {}
+        self._sorted_mz = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __contains__(self, id):
+        return str(id) in self.objects
+
+    def close(self):
+        if self.mode != 'r' and not self.file.closed:
+            self._write_index()
+        self.file.close()
+
+    def _read_index(self):
+        end = self.file.seek(0, 2)
+        trailer = self._find_trailer(end)
+        if trailer is None:
+            raise ValueError("%s is not a metDataModel object container." %self.path)
+        index_offset, index_end = trailer
+        self.file.seek(index_offset)
+        index = json.loads(zlib.decompress(self.file.read(index_end - index_offset)))
+        self.blocks, self.objects = index['blocks'], index['objects']
+        # new blocks go after everything, incl. an incomplete append
+        self.data_end = end
+
+    def _valid_trailer(self, position):
+        '''(index offset, index end) if a trailer ending at position, with a readable index, else None.'''
+        if position < 2 * len(MAGIC) + 8:
+            return None
+        self.file.seek(position - 8 - len(MAGIC))
+        index_offset = struct.unpack('<Q', self.file.read(8))[0]
+        if self.file.read(len(MAGIC)) != MAGIC or not len(MAGIC) <= index_offset < position - 8 - len(MAGIC):
+            return None
+        self.file.seek(index_offset)
+        try:
+            index = json.loads(zlib.decompress(self.file.read(position - 8 - len(MAGIC) - index_offset)))
+        except (zlib.error, ValueError):
+            return None
+        if not isinstance(index, dict) or 'blocks' not in index:
+            return None
+        return index_offset, position - 8 - len(MAGIC)
+
+    def _find_trailer(self, end, window=1 << 20):
+        '''
+        Locate the last complete trailer. It is at the end of the file, unless an append was interrupted,
+        in which case the file is searched backwards for MAGIC.
+        '''
+        self.file.seek(0)
+        if self.file.read(len(MAGIC)) != MAGIC:
+            return None
+        trailer = self._valid_trailer(end)
+        position = end
+        while trailer is None and position > len(MAGIC):
+            start = max(len(MAGIC), position - window)
+            self.file.seek(start)
+            data = self.file.read(position - start + len(MAGIC) - 1)
+            found = data.rfind(MAGIC)
+            while found >= 0 and trailer is None:
+                trailer = self._valid_trailer(start + found + len(MAGIC))
+                found = data.rfind(MAGIC, 0, found + len(MAGIC) - 1)
+            position = start
+        return trailer
+
+    def _write_index(self):
+        index = zlib.compress(json.dumps({'blocks': self.blocks, 'objects': self.objects}).encode(), 
+                              self.compression_level)
+        self.file.seek(self.data_end)
+        self.file.write(index)
+        self.file.write(struct.pack('<Q', self.data_end))
+        self.file.write(MAGIC)
+        self.file.truncate()
+        self.file.flush()
+        self.data_end = self.file.tell()
+
+    def append(self, list_members):
+        '''
+        Add metDataMember objects, written in compressed blocks of block_size objects, sorted by m/z.
+        An object with an id already in the container replaces it in the index.
+        '''
+        if self.mode == 'r':
+            raise ValueError("Container %s is opened read-only." %self.path)
+        keyed = sorted(((self.mz_key(m), m) for m in list_members), 
+                       key=lambda x: (x[0] is None, x[0] if x[0] is not None else 0))
+        for ii in range(0, len(keyed), self.block_size):
+            chunk = keyed[ii: ii + self.block_size]
+            data = zlib.compress(json.dumps([m.serialize() for _, m in chunk]).encode(), self.compression_level)
+            block = len(self.blocks)
+            mzs = [mz for mz, _ in chunk if mz is not None]
+            self.blocks.append([self.data_end, len(data), min(mzs, default=None), max(mzs, default=None)])
+            self.file.seek(self.data_end)
+            self.file.write(data)
+            self.data_end += len(data)
+            for position, (mz, member) in enumerate(chunk):
+                self.objects[str(member.id)] = [block, position, mz]
+        self._sorted_mz = None
+
+    def _read_block(self, block):
+        if block not in self._block_cache:
+            offset, length = self.blocks[block][:2]
+            self.file.seek(offset)
+            # keep only the last block, which serves consecutive reads without holding the archive in memory
+            self._block_cache = {block: json.loads(zlib.decompress(self.file.read(length)))}
+        return self._block_cache[block]
+
+    def ids(self):
+        '''Ids of all objects, as str.'''
+        return list(self.objects)
+
+    def get(self, id):
+        '''
+        Read one object by id, decompressing only its block. Raises KeyError if not found.
+        '''
+        block, position, _ = self.objects[str(id)]
+        return metDataMember.deserialize(self._read_block(block)[position])
+
+    def get_many(self, ids):
+        '''
+        Read objects by ids, grouped by block so that each block is decompressed once. Returns in order of ids.
+        '''
+        located = sorted((self.objects[str(id)][:2], ii) for ii, id in enumerate(ids))
+        result = [None] * len(located)
+        for (block, position), ii in located:
+            result[ii] = metDataMember.deserialize(self._read_block(block)[position])
+        return result
+
+    def query_mz(self, low, high):
+        '''
+        Read objects with m/z in [low, high], decompressing only blocks overlapping the range.
+        '''
+        if self._sorted_mz is None:
+            pairs = sorted((mz, id) for id, (_, _, mz) in self.objects.items() if mz is not None)
+            self._sorted_mz = ([x[0] for x in pairs], [x[1] for x in pairs])
+        mzs, ids = self._sorted_mz
+        return self.get_many(ids[bisect.bisect_left(mzs, low): bisect.bisect_right(mzs, high)])
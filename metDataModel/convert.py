@@ -0,0 +1,229 @@
+'''
+Bulk conversion between the classes in core_simple and core, e.g. for legacy asari outputs.
+
+The two hierarchies define parallel classes with mostly the same attributes.
+Field mappings are computed once per class, then applied to whole collections:
+objects are created by __new__ and their __dict__ filled from the mapping,
+without calling constructors or introspecting each object.
+Fields that can hold other model objects (from core annotations, e.g. Feature.list_peaks: list[str, Peak])
+are converted recursively; shared and cyclic references, e.g. Sample.experiment, are preserved.
+Other values, e.g. lists of intensity, are shared between the input and output objects, not copied.
+
+Example:
+    core_features = simple_to_core(list_simple_features)
+    empCpds = simple_serialized_to_core(json.load(open('empCpds.json')), 'EmpiricalCompound')
+'''
+
+import copy
+import gc
+import re
+import dataclasses
+
+from metDataModel import core, core_simple
+
+# core_simple attribute -> core field, where names differ
+field_renames = {
+    'Peak': {'min_rtime': 'min_ritme'},
+    'Gene': {'linked_dieases': 'linked_diseases'},
+}
+
+# fields holding model objects that are not declared in core annotations
+extra_object_fields = {
+    'Sample': ['list_MassTracks'],
+    'ArrayOfSpectra': ['sample'],
+}
+
+# keys in core_simple serialize() output -> core field; None to drop
+serialized_renames = {
+    'Experiment': {'study_id': 'parent_study'},
+    'Feature': {'apex': None},
+    'Compound': {'identifiers': 'db_ids'},
+}
+# keys in core_simple.EmpiricalCompound.serialize() MS1_pseudo_Spectra
+serialized_MS1_renames = {'feature_id': 'id'}
+
+# core_simple.Sample requires a registry
+_simple_constructor_args = {
+    'Sample': {'registry': {'input_file': '', 'name': '', 'sample_id': '', 'list_retention_time': []}},
+}
+
+
+class _Plan:
+    '''
+    Precomputed mapping for one class: target class, renamed fields,
+    defaults of target fields not in the source, and fields that hold model objects.
+    '''
+    def __init__(self, target, renames, defaults, object_fields):
+        self.target = target
+        self.renames = renames
+        self.defaults = defaults
+        self.object_fields = object_fields
+
+    def new_dict(self, source_dict):
+        result = source_dict.copy()
+        for old, new in self.renames.items():
+            if old in result:
+                result[new] = result.pop(old)
+        for name, default in self.defaults.items():
+            if name not in result:
+                result[name] = default()
+        return result
+
+
+def _default_getter(value):
+    if isinstance(value, (list, dict, set)):
+        return lambda: copy.deepcopy(value)
+    return lambda: value
+
+def _core_defaults(cls):
+    '''
+    Defaults of core dataclass fields, from one template instance; mutable values are made per object.
+    '''
+    template = vars(cls())
+    defaults = {}
+    for f in dataclasses.fields(cls):
+        if f.name not in template:
+            continue
+        if f.default_factory is not dataclasses.MISSING:
+            defaults[f.name] = f.default_factory
+        else:
+            defaults[f.name] = _default_getter(template[f.name])
+    return defaults
+
+def _simple_defaults(cls):
+    template = vars(cls(**_simple_constructor_args.get(cls.__name__, {})))
+    return {k: _default_getter(v) for k, v in template.items()}
+
+def _core_object_fields(cls, class_names):
+    pattern = re.compile(r'\b(%s)\b' %'|'.join(class_names))
+    fields = [f.name for f in dataclasses.fields(cls) if pattern.search(str(f.type))]
+    return fields + extra_object_fields.get(cls.__name__, [])
+
+
+def _build_plans():
+    registry = core.metDataMember._subclass_registry()
+    to_core, to_simple, all_core_defaults = {}, {}, {}
+    for name, core_class in registry.items():
+        simple_class = getattr(core_simple, name, None)
+        if not isinstance(simple_class, type) or core_class.__module__ != core.__name__:
+            continue
+        renames = field_renames.get(name, {})
+        object_fields = _core_object_fields(core_class, registry)
+        core_defaults, simple_defaults = _core_defaults(core_class), _simple_defaults(simple_class)
+        all_core_defaults[core_class] = core_defaults
+        reverse = {v: k for k, v in renames.items()}
+        to_core[simple_class] = _Plan(
+            core_class, renames,
+            {k: v for k, v in core_defaults.items() if reverse.get(k, k) not in simple_defaults},
+            object_fields)
+        to_simple[core_class] = _Plan(
+            simple_class, reverse,
+            {k: v for k, v in simple_defaults.items() if renames.get(k, k) not in core_defaults},
+            [reverse.get(k, k) for k in object_fields])
+    return {'to_core': to_core, 'to_simple': to_simple, 'core_defaults': all_core_defaults}
+
+_plans = {}
+
+def _get_plans():
+    '''
+    Plans are built once, on first use, so that importing this module stays cheap.
+    '''
+    if not _plans:
+        _plans.update(_build_plans())
+    return _plans
+
+
+def _convert(obj, plans, memo):
+    plan = plans.get(type(obj))
+    if plan is None:
+        return obj
+    if id(obj) in memo:
+        return memo[id(obj)]
+    new = plan.target.__new__(plan.target)
+    memo[id(obj)] = new
+    values = plan.new_dict(vars(obj))
+    for name in plan.object_fields:
+        value = values.get(name)
+        if isinstance(value, (list, tuple)):
+            values[name] = [_convert(x, plans, memo) for x in value]
+        elif isinstance(value, dict):
+            values[name] = {k: _convert(v, plans, memo) for k, v in value.items()}
+        elif value is not None:
+            values[name] = _convert(value, plans, memo)
+    new.__dict__ = values
+    return new
+
+def _bulk_convert(objects, plans):
+    # no reference cycles are freed during conversion, and the cyclic GC would otherwise 
+    # rescan the growing output repeatedly
+    memo, enabled = {}, gc.isenabled()
+    gc.disable()
+    try:
+        return [_convert(obj, plans, memo) for obj in objects]
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def simple_to_core(objects) -> list:
+    '''
+    Convert core_simple objects to core objects, e.g. a list of core_simple.Feature to core.Feature.
+    Objects of other types are returned as they are.
+
+    Args:
+        objects (iterable): core_simple objects, can be of mixed classes
+
+    Returns:
+        list: core objects, in input order
+    '''
+    return _bulk_convert(objects, _get_plans()['to_core'])
+
+def core_to_simple(objects) -> list:
+    '''
+    Convert core objects to core_simple objects, the reverse of simple_to_core.
+    Fields without a core_simple counterpart, e.g. Sample.batch, are kept as attributes.
+
+    Args:
+        objects (iterable): core objects, can be of mixed classes
+
+    Returns:
+        list: core_simple objects, in input order
+    '''
+    return _bulk_convert(objects, _get_plans()['to_simple'])
+
+
+def simple_serialized_to_core(list_serialized, class_name) -> list:
+    '''
+    Convert dictionaries from core_simple serialize(), e.g. in legacy JSON files, to core objects.
+    Keys are mapped by serialized_renames; e.g. core_simple.EmpiricalCompound.serialize writes
+    MS1_pseudo_Spectra entries with 'feature_id', which is mapped back to 'id'.
+    Fields absent in the dictionaries take core defaults.
+
+    Args:
+        list_serialized (iterable): dictionaries serialized from core_simple objects of one class
+        class_name (str): name of the class, e.g. 'Feature' or 'EmpiricalCompound'
+
+    Returns:
+        list: core objects
+    '''
+    plan = _get_plans()['to_core'][getattr(core_simple, class_name)]
+    renames = serialized_renames.get(class_name, {})
+    renames = {**{k: v for k, v in plan.renames.items() if k not in renames}, **renames}
+    core_defaults = _get_plans()['core_defaults'][plan.target]
+    results = []
+    for serialized in list_serialized:
+        values = {}
+        for key, value in serialized.items():
+            name = renames.get(key, key)
+            if name is not None:
+                values[name] = value
+        if class_name == 'EmpiricalCompound' and 'MS1_pseudo_Spectra' in values:
+            values['MS1_pseudo_Spectra'] = [{serialized_MS1_renames.get(k, k): v for k, v in peak.items()}
+                                            for peak in values['MS1_pseudo_Spectra']]
+        for name, default in core_defaults.items():
+            if name not in values:
+                values[name] = default()
+        new = plan.target.__new__(plan.target)
+        new.__dict__ = values
+        results.append(new)
+    return results
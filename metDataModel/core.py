@@ -31,11 +31,27 @@ which allow easy access to attributes but have no additional methods.
 # only considering mass spec not NMR data here
 #
 from __future__ import annotations
-from typing import Union
+from typing import Union, TYPE_CHECKING
 import abc
-import pandas as pd
+import hashlib
+import numpy as np
 import json
-from dataclasses import dataclass, field
+import pickle
+import os
+import sys
+import multiprocessing as mp
+from collections import OrderedDict
+import reprlib
+from dataclasses import dataclass, field, fields
+from metDataModel import processing
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 # this is a master list of serializable primitives, i.e., not iterable.
@@ -44,6 +60,10 @@ serializable_primitive_type = Union[str, float, int, tuple]
 # this is a datastructure to handle nested, up to depth 1, of serializable primitives in dicts and lists
 serializable_type = Union[serializable_primitive_type, dict[serializable_primitive_type, serializable_primitive_type], list[serializable_primitive_type]]
 
+# JSON encoder used by dump/bulk_dump/load; orjson is used if installed, else the standard library.
+# Set to 'json' to force the standard library, e.g. when NaN values must be kept.
+JSON_BACKEND = 'orjson' if orjson else 'json'
+
 
 class metDataMember(abc.ABC):
     """metDataMember
@@ -85,7 +105,23 @@ class metDataMember(abc.ABC):
             return to_serialize.serialize()
     
     @staticmethod
-    def __recursive_deserialize(to_deserialize) -> object:
+    def _subclass_registry() -> dict:
+        """
+        Map class names to all metDataMember subclasses, including those derived 
+        from other subclasses (e.g. in derived.py). Classes are not instantiated here.
+
+        Returns:
+            dict: class name to class
+        """
+        registry, to_visit = {}, [metDataMember]
+        while to_visit:
+            for subclass in to_visit.pop().__subclasses__():
+                registry[subclass.__name__] = subclass
+                to_visit.append(subclass)
+        return registry
+
+    @staticmethod
+    def __recursive_deserialize(to_deserialize, constructor_map, references=None) -> object:
         """
         This method converts a serialized metDataObject, represented using a dictionary, and 
         returns the metDataObject(s). This is achived using recursion. A serialized metDataObject
@@ -99,25 +135,71 @@ class metDataMember(abc.ABC):
         deserialize each member using recursion until we encountered a str, float, or int, which
         is returned as is. 
 
+        Output of serialize_graph is also handled: an object with a "$id" field is registered 
+        in references before its fields are deserialized, so that {"$ref": n} encountered later, 
+        including from inside the object itself, resolves to the same object.
+
         Args:
             to_deserialize (dict): the serialized metDataMember as dict
+            constructor_map (dict): class name to class, see _subclass_registry
+            references (dict): "$id" to deserialized object, shared within one serialized graph
 
         Returns:
             object: the deserialized metDataMember
         """
-        constructor_map = {x().__class__.__name__: x for x in metDataMember.__subclasses__()}
+        if references is None:
+            references = {}
         if isinstance(to_deserialize, dict):
             if "metDataMember_subclass" in to_deserialize:
-                empty_metDataObject = constructor_map[to_deserialize["metDataMember_subclass"]]()
-                to_deserialize_data = {k: v for k, v in to_deserialize.items() if k != "metDataMember_subclass"}
-                empty_metDataObject.__dict__ = metDataMember.__recursive_deserialize(to_deserialize_data)
+                constructor = constructor_map[to_deserialize["metDataMember_subclass"]]
+                empty_metDataObject = constructor.__new__(constructor)
+                if "$id" in to_deserialize:
+                    references[to_deserialize["$id"]] = empty_metDataObject
+                to_deserialize_data = {k: v for k, v in to_deserialize.items() if k not in ("metDataMember_subclass", "$id")}
+                empty_metDataObject.__dict__ = metDataMember.__recursive_deserialize(to_deserialize_data, constructor_map, references)
                 return empty_metDataObject
+            elif "$ref" in to_deserialize and len(to_deserialize) == 1:
+                return references[to_deserialize["$ref"]]
             else:
-                return {metDataMember.__recursive_deserialize(key): metDataMember.__recursive_deserialize(value) for key, value in to_deserialize.items()} 
+                return {metDataMember.__recursive_deserialize(key, constructor_map, references): 
+                        metDataMember.__recursive_deserialize(value, constructor_map, references) for key, value in to_deserialize.items()} 
         elif isinstance(to_deserialize, (str, float, int)):
             return to_deserialize
         elif isinstance(to_deserialize, (list, tuple)):
-            return [metDataMember.__recursive_serialize(x) for x in to_deserialize]
+            return [metDataMember.__recursive_deserialize(x, constructor_map, references) for x in to_deserialize]
+
+    @staticmethod
+    def __graph_serialize(to_serialize, memo) -> object:
+        """
+        Like __recursive_serialize, but each metDataMember is emitted once, with a "$id" field numbering it 
+        in order of appearance, and later occurrences are emitted as {"$ref": n}.
+        This keeps shared objects shared (e.g. a Peak in both Sample.list_peaks and Feature.list_peaks), 
+        and stops cycles (e.g. Sample.experiment pointing back to the Experiment).
+
+        Args:
+            to_serialize: a value of a metDataObject's data members
+            memo (dict): id() of objects already emitted to their "$id"
+
+        Returns:
+            a JSON/YAML friendly representation of to_serialize
+        """
+        if isinstance(to_serialize, (str, float, int)):
+            return to_serialize
+        elif isinstance(to_serialize, metDataMember):
+            if id(to_serialize) in memo:
+                return {"$ref": memo[id(to_serialize)]}
+            memo[id(to_serialize)] = len(memo)
+            serialized = {"$id": memo[id(to_serialize)], "metDataMember_subclass": type(to_serialize).__name__}
+            for key, value in vars(to_serialize).items():
+                if not key.startswith("_"):
+                    serialized[key] = metDataMember.__graph_serialize(value, memo)
+            return serialized
+        elif isinstance(to_serialize, dict):
+            return {metDataMember.__graph_serialize(key, memo): metDataMember.__graph_serialize(value, memo) for key, value in to_serialize.items()}
+        elif isinstance(to_serialize, (list, tuple)):
+            return [metDataMember.__graph_serialize(x, memo) for x in to_serialize]
+        elif hasattr(to_serialize, "serialize"):
+            return to_serialize.serialize()
 
     def serialize(self) -> dict:
         """
@@ -126,14 +208,29 @@ class metDataMember(abc.ABC):
         Returns:
             dict: a dictionary representation of the object that is JSON/YAML friendly.
         """        
-        to_serialize = {x: getattr(self, x) for x in vars(self) if not x.startswith("_")}
+        # values are read from __dict__, so that lazy fields (e.g. Experiment.feature_DataFrame) are not created
+        to_serialize = {x: v for x, v in vars(self).items() if not x.startswith("_")}
         to_serialize["metDataMember_subclass"] =  type(self).__name__
         return metDataMember.__recursive_serialize(to_serialize)
 
+    def serialize_graph(self) -> dict:
+        """
+        Serialize the object, preserving shared and cyclic references among nested metDataMembers.
+        Each object is emitted once; later occurrences are encoded as {"$ref": n}, 
+        n being the "$id" given to the object where first emitted.
+        "$id" numbers are local to one serialization, as object id fields need not be unique.
+        The result is restored by deserialize.
+
+        Returns:
+            dict: a dictionary representation of the object that is JSON/YAML friendly.
+        """
+        return metDataMember.__graph_serialize(self, {})
+
     @staticmethod
     def deserialize(serialized) -> object:
         """
         Given a dictionary representing a serialized metDataMember, return the  object it reprsents.
+        Output of both serialize and serialize_graph can be deserialized.
 
         Args:
             serialized (dict): dictionary representing a serialized metDataMember
@@ -141,7 +238,33 @@ class metDataMember(abc.ABC):
         Returns:
             object: the metDataMember object represented by the dictionary
         """
-        return metDataMember.__recursive_deserialize(serialized)
+        return metDataMember.__recursive_deserialize(serialized, metDataMember._subclass_registry())
+
+    @staticmethod
+    def bulk_deserialize(list_serialized, processes=None, chunk_size=None) -> list:
+        """
+        Deserialize a large list of serialized metDataMembers, e.g. hundreds of thousands 
+        of Feature or EmpiricalCompound dicts, using a pool of worker processes.
+        The list is split into contiguous chunks, and the results are concatenated 
+        in chunk order, so the output is in the same order as the input.
+
+        Args:
+            list_serialized (list): list of dictionaries representing serialized metDataMembers
+            processes (int): number of worker processes, default to CPU count. 1 runs in current process.
+            chunk_size (int): number of objects per chunk, default to even split in 4 chunks per process.
+
+        Returns:
+            list: the deserialized metDataMembers, in input order
+        """
+        processes = processes or mp.cpu_count()
+        if not chunk_size:
+            chunk_size = max(1, -(-len(list_serialized) // (processes * 4)))
+        if processes == 1 or len(list_serialized) <= chunk_size:
+            return _deserialize_chunk(list_serialized)
+        chunks = [list_serialized[ii: ii + chunk_size] for ii in range(0, len(list_serialized), chunk_size)]
+        with mp.Pool(processes) as pool:
+            results = pool.map(_deserialize_chunk, chunks)
+        return [x for chunk in results for x in chunk]
     
     def to_JSON(self) -> str:
         """
@@ -150,7 +273,7 @@ class metDataMember(abc.ABC):
         Returns:
             str: the metDataObject's JSON representation
         """
-        json.dumps(self.serialize())
+        return json.dumps(self.serialize())
     
     @staticmethod
     def from_JSON(json_string) -> object:
@@ -163,7 +286,246 @@ class metDataMember(abc.ABC):
         Returns:
             object: the metDataObject for the provided JSON
         """
-        json.loads(metDataMember.deserialize(json_string))
+        return metDataMember.deserialize(json.loads(json_string))
+
+    def to_YAML(self, stream=None) -> str:
+        """
+        Convert a metDataObject to YAML, using the libyaml C dumper when available. Requires PyYAML.
+        Fields are kept in their defined order, for human editing.
+
+        Args:
+            stream (file): optional writable file handle; if given, YAML is written to it and None returned
+
+        Returns:
+            str: the metDataObject's YAML representation
+        """
+        yaml, _, SafeDumper = _yaml()
+        return yaml.dump(self.serialize(), stream, Dumper=SafeDumper, sort_keys=False, allow_unicode=True)
+
+    @staticmethod
+    def from_YAML(yaml_string) -> object:
+        """
+        Convert YAML to a metDataObject, using the libyaml C loader when available. Requires PyYAML.
+        Nested metDataObjects, e.g. Feature or Peak, are restored via their metDataMember_subclass field.
+
+        Args:
+            yaml_string (str): the YAML representing a metDataObject, or a readable file handle
+
+        Returns:
+            object: the metDataObject for the provided YAML
+        """
+        yaml, SafeLoader, _ = _yaml()
+        return metDataMember.deserialize(yaml.load(yaml_string, Loader=SafeLoader))
+
+    def dump(self, fp, backend=None, preserve_references=False):
+        """
+        Write the metDataObject as JSON to a file handle opened in text mode.
+        Nested metDataObjects, lists and dicts are serialized and written element by element,
+        so that neither the full serialized dict nor a full-size JSON string is built in memory.
+
+        Args:
+            fp (file): writable text file handle
+            backend (str): 'json' or 'orjson', default to JSON_BACKEND
+            preserve_references (bool): write as serialize_graph, for shared or cyclic objects
+        """
+        _write_JSON(self, fp, _JSON_encoder(backend or JSON_BACKEND), {} if preserve_references else None)
+
+    @staticmethod
+    def bulk_dump(list_members, fp, backend=None):
+        """
+        Write a list of metDataObjects as a JSON array to a file handle opened in text mode.
+        Objects are serialized and written one at a time, element by element as in dump,
+        so that neither the full list of dicts nor the full JSON string is held in memory.
+
+        Args:
+            list_members (iterable): metDataObjects, can be a generator
+            fp (file): writable text file handle
+            backend (str): 'json' or 'orjson', default to JSON_BACKEND
+        """
+        encode = _JSON_encoder(backend or JSON_BACKEND)
+        fp.write('[')
+        for ii, member in enumerate(list_members):
+            if ii:
+                fp.write(', ')
+            _write_JSON(member, fp, encode)
+        fp.write(']')
+
+    @staticmethod
+    def load(fp, backend=None) -> object:
+        """
+        Read JSON from a file handle and return the metDataObject(s) it represents.
+        This works for both dump and bulk_dump outputs.
+
+        Args:
+            fp (file): readable file handle
+            backend (str): 'json' or 'orjson', default to JSON_BACKEND
+
+        Returns:
+            object: the metDataObject, or list of metDataObjects
+        """
+        if (backend or JSON_BACKEND) == 'orjson':
+            serialized = orjson.loads(fp.read())
+        else:
+            serialized = json.load(fp)
+        return metDataMember.deserialize(serialized)
+
+def _yaml():
+    '''
+    Return the yaml module with safe loader and dumper, the libyaml C versions when available.
+    PyYAML is imported on first use, as it is only needed by to_YAML and from_YAML.
+    '''
+    try:
+        import yaml
+    except ImportError:
+        raise ImportError("YAML conversion requires PyYAML, e.g. pip install pyyaml.")
+    return (yaml, getattr(yaml, 'CSafeLoader', yaml.SafeLoader), getattr(yaml, 'CSafeDumper', yaml.SafeDumper))
+
+# to tell if serialize is overridden (or wrapped, see instrumentation), then _write_JSON calls it
+_serialize_method = metDataMember.serialize
+
+def _JSON_encoder(backend):
+    '''
+    Return a function that encodes a serialized object to a JSON str, using the given backend.
+    '''
+    if backend == 'orjson':
+        if orjson is None:
+            raise ImportError("JSON backend 'orjson' is requested but not installed.")
+        # numpy scalars, e.g. float64 from feature tables, pass as floats in _write_JSON
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        return lambda x: orjson.dumps(x, option=option).decode()
+    elif backend == 'json':
+        return json.dumps
+    else:
+        raise ValueError("Unknown JSON backend %s, use 'json' or 'orjson'." %backend)
+
+def _JSON_key(key) -> str:
+    '''JSON object key, as json.dumps would write it.'''
+    return json.dumps(key) if isinstance(key, str) else '"%s"' %json.dumps(key)
+
+def _is_flat_list(value) -> bool:
+    return all(isinstance(x, (str, float, int)) for x in value)
+
+def _write_JSON(value, fp, encode, memo=None):
+    '''
+    Write value as JSON to fp, element by element: metDataMembers are serialized field by field as they are written,
+    and lists and dicts item by item, so that neither the serialized dict tree nor a full-size JSON string is built.
+    Lists of primitives, e.g. list_intensity, are encoded in one call.
+    The output is the same as encoding serialize(), or serialize_graph() if memo is a dict.
+
+    Args:
+        value: metDataMember, or value as in a serialized dict
+        fp (file): writable text file handle
+        encode (function): JSON encoder of primitives and flat lists, see _JSON_encoder
+        memo (dict): id of metDataMember to "$id", to write references as in serialize_graph; None for serialize
+    '''
+    if isinstance(value, (str, float, int)):
+        fp.write(encode(value))
+    elif isinstance(value, metDataMember) and type(value).serialize is _serialize_method:
+        if memo is not None:
+            if id(value) in memo:
+                fp.write('{"$ref": %d}' %memo[id(value)])
+                return
+            memo[id(value)] = len(memo)
+            fp.write('{"$id": %d, "metDataMember_subclass": %s' %(memo[id(value)], json.dumps(type(value).__name__)))
+            separator = ', '
+        else:
+            fp.write('{')
+            separator = ''
+        for key, x in vars(value).items():
+            if not key.startswith('_'):
+                fp.write(separator + _JSON_key(key) + ': ')
+                _write_JSON(x, fp, encode, memo)
+                separator = ', '
+        if memo is None:
+            fp.write(separator + '"metDataMember_subclass": ' + json.dumps(type(value).__name__))
+        fp.write('}')
+    elif isinstance(value, dict):
+        fp.write('{')
+        for ii, (key, x) in enumerate(value.items()):
+            fp.write((', ' if ii else '') + _JSON_key(key) + ': ')
+            _write_JSON(x, fp, encode, memo)
+        fp.write('}')
+    elif isinstance(value, (list, tuple)):
+        if _is_flat_list(value):
+            fp.write(encode(list(value)))
+            return
+        fp.write('[')
+        for ii, x in enumerate(value):
+            if ii:
+                fp.write(', ')
+            _write_JSON(x, fp, encode, memo)
+        fp.write(']')
+    elif hasattr(value, "serialize"):
+        _write_JSON(value.serialize(), fp, encode, memo)
+    else:
+        # as in serialize, values that are not serializable are written as null
+        fp.write('null')
+
+def _deserialize_chunk(list_serialized) -> list:
+    '''
+    Worker function for metDataMember.bulk_deserialize. 
+    Kept at module level so that it can be pickled by multiprocessing.
+    '''
+    constructor_map = metDataMember._subclass_registry()
+    return [metDataMember._metDataMember__recursive_deserialize(x, constructor_map) for x in list_serialized]
+
+def _content_hash(content) -> str:
+    '''
+    Hash JSON-compatible content to a hex str, stable across Python sessions.
+    '''
+    return hashlib.blake2b(json.dumps(content).encode(), digest_size=16).hexdigest()
+
+def _feature_ref_id(ref):
+    '''
+    Feature ID from a reference in EmpiricalCompound, which can be an ID, a Feature/Peak or a dict.
+    '''
+    if isinstance(ref, dict):
+        return ref.get('id', ref.get('feature_id', ref.get('id_number')))
+    return getattr(ref, 'id', ref)
+
+def deduplicate(list_members) -> list:
+    '''
+    Remove duplicates by content_hash in a single pass, keeping the first occurrence and input order.
+    Members without a hash (content_hash returns None) are all kept.
+    '''
+    seen, unique = set(), []
+    for member in list_members:
+        key = member.content_hash()
+        if key is None:
+            unique.append(member)
+        elif key not in seen:
+            seen.add(key)
+            unique.append(member)
+    return unique
+
+def _dataframe():
+    '''
+    The pandas adapter, metDataModel.dataframe, imported on first use so that core can be imported without pandas.
+    '''
+    from metDataModel import dataframe
+    return dataframe
+
+
+class _LazyDataFrame:
+    '''
+    Descriptor for DataFrame fields of Experiment, e.g. feature_DataFrame.
+    An empty DataFrame is created on first access if no DataFrame was given, 
+    so that pandas is imported only when DataFrames are used.
+    '''
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return None         # dataclass default, meaning not set
+        value = instance.__dict__.get(self.name)
+        if value is None:
+            value = instance.__dict__[self.name] = _dataframe().empty()
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.name] = value
+
 
 @dataclass
 class Study(metDataMember):
@@ -235,9 +597,497 @@ class Experiment(metDataMember):
         'sample_list': [],
         'file_sample_mapper': {}
     })
-    feature_DataFrame: pd.DataFrame = field(default_factory=pd.DataFrame)
+    # DataFrames are created on first access, see _LazyDataFrame
+    feature_DataFrame: pd.DataFrame = _LazyDataFrame()
     ordered_samples: list[str, Sample] = field(default_factory=list)
     List_of_empCpds: list[dict, EmpiricalCompound] = field(default_factory=list)
+    # typed columns of Feature.statistics, indexed as feature_DataFrame; see compute_feature_statistics
+    feature_statistics: pd.DataFrame = _LazyDataFrame()
+
+    #
+    # Sample subsets by Sample.sample_type, e.g. QC, blank, study_sample.
+    # Sample columns in feature_DataFrame are matched by Sample.name, or Sample.id if name is not a column.
+    # The cache is private (not serialized) and rebuilt when feature_DataFrame is replaced, 
+    # its columns change or any sample in ordered_samples changes name, id or sample_type.
+    #
+
+    def _sample_type_signature(self):
+        return (tuple(self.feature_DataFrame.columns),
+                tuple((s.name, s.id, s.sample_type) for s in self.ordered_samples if isinstance(s, Sample)))
+
+    def _matched_samples(self) -> dict:
+        '''
+        Column position in feature_DataFrame to Sample, for samples in ordered_samples, sorted by position.
+        '''
+        columns = {c: ii for ii, c in enumerate(self.feature_DataFrame.columns)}
+        matched = {}
+        for sample in self.ordered_samples:
+            if isinstance(sample, Sample):
+                col = sample.name if sample.name in columns else sample.id
+                if col in columns:
+                    matched[columns[col]] = sample
+        return dict(sorted(matched.items()))
+
+    def _sample_column_indices(self) -> dict:
+        '''
+        Column positions in feature_DataFrame per sample_type, not cached.
+        '''
+        indices = {}
+        for position, sample in self._matched_samples().items():
+            indices.setdefault(sample.sample_type, []).append(position)
+        return {k: np.array(v, dtype=np.intp) for k, v in indices.items()}
+
+    def _get_sample_type_cache(self) -> dict:
+        '''
+        Return cache of column indices per sample_type and the intensity matrix grouped by sample_type,
+        where each sample_type occupies a contiguous block of columns.
+        '''
+        cache = getattr(self, '_sample_type_cache', None)
+        signature = self._sample_type_signature()
+        if cache and cache['DataFrame'] is self.feature_DataFrame and cache['signature'] == signature:
+            return cache
+
+        indices = self._sample_column_indices()
+        blocks, start = {}, 0
+        for k, v in indices.items():
+            blocks[k] = slice(start, start + len(v))
+            start += len(v)
+        order = np.concatenate(list(indices.values())) if indices else np.array([], dtype=np.intp)
+        # column-major so that each sample block is contiguous in memory
+        matrix = np.asfortranarray(self.feature_DataFrame.iloc[:, order].to_numpy())
+        matrix.flags.writeable = False
+        self._sample_type_cache = {
+            'DataFrame': self.feature_DataFrame,
+            'signature': signature,
+            'indices': indices,
+            'blocks': blocks,
+            'matrix': matrix,
+        }
+        return self._sample_type_cache
+
+    def invalidate_sample_type_cache(self):
+        '''
+        Drop cached sample subsets. Only needed after values in feature_DataFrame are modified in place.
+        '''
+        self._sample_type_cache = None
+
+    def sample_type_indices(self, sample_type) -> np.ndarray:
+        '''
+        Column positions in feature_DataFrame of samples of sample_type, in column order.
+        '''
+        return self._get_sample_type_cache()['indices'].get(sample_type, np.array([], dtype=np.intp))
+
+    def sample_type_view(self, sample_type) -> np.ndarray:
+        '''
+        Read-only 2-D array (features x samples) of samples of sample_type, in column order.
+        This is a view into a cached matrix, thus repeated calls do not copy data.
+        '''
+        cache = self._get_sample_type_cache()
+        return cache['matrix'][:, cache['blocks'].get(sample_type, slice(0, 0))]
+
+    def get_QC_view(self) -> np.ndarray:
+        return self.sample_type_view('QC')
+
+    def get_blank_view(self) -> np.ndarray:
+        return self.sample_type_view('blank')
+
+    def get_study_view(self) -> np.ndarray:
+        '''Samples of sample_type 'study_sample'; pooled study samples are not included.'''
+        return self.sample_type_view('study_sample')
+
+    def filter_features(self, min_blank_ratio=3, max_QC_cv=0.3, min_detection_rate=0.5, 
+                        detection_threshold=0, id_column='id_number') -> pd.DataFrame:
+        '''
+        Blank subtraction and QC-based filtering of features, using Sample.sample_type.
+        Per-feature statistics are computed in one vectorized pass over feature_DataFrame:
+            blank_ratio, mean of study samples over mean of blanks (inf if no blank signal);
+            QC_cv, coefficient of variation in QC samples (NaN with fewer than 2 QCs, not filtered);
+            detection_rate, fraction of study samples with intensity above detection_threshold.
+        Failing features are dropped from feature_DataFrame and from List_of_empCpds 
+        (list_features and MS1_pseudo_Spectra); empCpds left without features are dropped.
+        Parameters are recorded in provenance['preprocess_parameters']['filter_features'].
+        ValueError is raised if no study sample matches a column of feature_DataFrame, 
+        rather than removing all features.
+
+        Args:
+            min_blank_ratio (float): minimal blank_ratio to keep a feature
+            max_QC_cv (float): maximal QC_cv to keep a feature
+            min_detection_rate (float): minimal detection_rate to keep a feature
+            detection_threshold (float): intensity above which a feature is detected in a sample
+            id_column (str): column of feature IDs in feature_DataFrame; index is used if not a column
+
+        Returns:
+            pd.DataFrame: statistics per feature, with column 'passed', indexed as feature_DataFrame before filtering
+        '''
+        if not self._sample_column_indices():
+            raise ValueError("No sample in ordered_samples matches a column of feature_DataFrame.")
+        study, blank, QC = (self.sample_type_view(x) for x in ('study_sample', 'blank', 'QC'))
+        if not study.shape[1]:
+            raise ValueError("No sample with sample_type 'study_sample' matches a column of feature_DataFrame.")
+        with np.errstate(divide='ignore', invalid='ignore'):
+            study_mean = np.nanmean(study, axis=1) if study.shape[1] else np.full(study.shape[0], np.nan)
+            blank_mean = np.nanmean(blank, axis=1) if blank.shape[1] else np.zeros(blank.shape[0])
+            blank_ratio = np.where(np.nan_to_num(blank_mean) > 0, study_mean / blank_mean, np.inf)
+            if QC.shape[1] > 1:
+                QC_cv = np.nanstd(QC, axis=1, ddof=1) / np.nanmean(QC, axis=1)
+            else:
+                QC_cv = np.full(QC.shape[0], np.nan)
+            detection_rate = (study > detection_threshold).mean(axis=1) if study.shape[1] else np.zeros(study.shape[0])
+
+        passed = (blank_ratio >= min_blank_ratio) & (detection_rate >= min_detection_rate) & ~(QC_cv > max_QC_cv)
+        stats = _dataframe().from_columns({
+            'blank_ratio': blank_ratio,
+            'QC_cv': QC_cv,
+            'detection_rate': detection_rate,
+            'passed': passed,
+        }, index=self.feature_DataFrame.index)
+
+        if id_column in self.feature_DataFrame.columns:
+            feature_ids = self.feature_DataFrame[id_column]
+        else:
+            feature_ids = self.feature_DataFrame.index.to_series()
+        self.remove_empCpd_features(set(feature_ids[~passed]))
+        self.feature_DataFrame = self.feature_DataFrame[passed]
+        self.provenance.setdefault('preprocess_parameters', {})['filter_features'] = {
+            'min_blank_ratio': min_blank_ratio,
+            'max_QC_cv': max_QC_cv,
+            'min_detection_rate': min_detection_rate,
+            'detection_threshold': detection_threshold,
+        }
+        return stats
+
+    def normalize(self, method='median', matrix=None, columns=None, chunk_size=256):
+        '''
+        Normalize intensities in place, by one of 'TIC', 'median', 'PQN' (probabilistic quotient) or 'quantile'.
+        Sample columns are processed in chunks of chunk_size, so that peak memory is bounded,
+        e.g. with a float32 feature_DataFrame or a numpy.memmap of the intensity matrix.
+        See metDataModel.processing for the algorithms.
+        The method, chunk_size and scaling factors (not the quantile reference) are recorded 
+        in provenance['preprocess_parameters']['normalization'].
+        Integer sample columns of feature_DataFrame are converted to float64; float32 columns stay float32.
+        ValueError is raised if there are no sample columns, e.g. no sample in ordered_samples matches a column.
+
+        Args:
+            method (str): 'TIC', 'median', 'PQN' or 'quantile'
+            matrix (np.ndarray): optional features x samples array or memmap to use instead of feature_DataFrame
+            columns (list): column positions of samples, default to all samples matched in ordered_samples,
+                or all columns of matrix
+            chunk_size (int): number of columns per chunk
+
+        Returns:
+            np.ndarray: scaling factors per sample, or reference distribution for quantile
+        '''
+        normalizers = {
+            'TIC': processing.normalize_TIC,
+            'median': processing.normalize_median,
+            'PQN': processing.normalize_PQN,
+            'quantile': processing.normalize_quantile,
+        }
+        if method not in normalizers:
+            raise ValueError("Unknown normalization method %s, use one of %s." %(method, list(normalizers)))
+        if matrix is None:
+            matrix = self.feature_DataFrame
+            if columns is None:
+                indices = list(self._sample_column_indices().values())
+                if not indices:
+                    raise ValueError("No sample in ordered_samples matches a column of feature_DataFrame.")
+                columns = np.sort(np.concatenate(indices)).astype(np.intp)
+        chunked = processing.ChunkedMatrix(matrix, columns, chunk_size)
+        if not len(chunked.columns):
+            raise ValueError("No sample columns to normalize.")
+        result = normalizers[method](chunked)
+        if matrix is self.feature_DataFrame:
+            self.invalidate_sample_type_cache()
+        parameters = {'method': method, 'chunk_size': chunk_size}
+        if method != 'quantile':
+            # one factor per sample; the quantile reference has one value per feature and is only returned
+            parameters['scaling_factors'] = [float(x) for x in result]
+        self.provenance.setdefault('preprocess_parameters', {})['normalization'] = parameters
+        return result
+
+    def compute_feature_statistics(self, group_key='sample_groups', groups=None) -> pd.DataFrame:
+        '''
+        Compute statistics of all features at once, stored as typed columns in self.feature_statistics,
+        rather than one Feature.statistics dict per feature. 
+        Use get_feature_statistics to get the dict of a single feature when needed.
+        See processing.group_statistics for the statistics (group means, fold change, 
+        t-test or ANOVA p_value and FDR). Requires scipy.
+
+        Args:
+            group_key (str): key in ObservationAnnotation to a dict of sample column to group, e.g.
+                {'sample_groups': {'sample_01': 'control', 'sample_02': 'case', ...}}
+            groups (list): groups to compare, in order, default to all in order of appearance
+
+        Returns:
+            pd.DataFrame: self.feature_statistics
+        '''
+        sample_groups = self.ObservationAnnotation[group_key]
+        if groups is not None:
+            sample_groups = {k: v for k, v in sample_groups.items() if v in groups}
+        columns = [c for c in sample_groups if c in self.feature_DataFrame.columns]
+        matrix = self.feature_DataFrame[columns].to_numpy(dtype=float)
+        result = processing.group_statistics(matrix, [sample_groups[c] for c in columns], groups)
+        self.feature_statistics = _dataframe().from_columns(result, index=self.feature_DataFrame.index)
+        return self.feature_statistics
+
+    def get_feature_statistics(self, feature_id, id_column='id_number') -> dict:
+        '''
+        Return the statistics of one feature as dict, in the format of Feature.statistics,
+        e.g. to fill feature.statistics = experiment.get_feature_statistics(feature.id).
+
+        Args:
+            feature_id (str): feature ID, in id_column of feature_DataFrame or its index
+            id_column (str): column of feature IDs in feature_DataFrame; index is used if not a column
+        '''
+        if id_column in self.feature_DataFrame.columns:
+            position = np.flatnonzero(self.feature_DataFrame[id_column].to_numpy() == feature_id)[0]
+            row = self.feature_statistics.iloc[position]
+        else:
+            row = self.feature_statistics.loc[feature_id]
+        return {k: row[k].item() for k in row.index}
+
+    def build_features_from_peaks(self, mz_tolerance_ppm=5, rt_tolerance=2, min_samples=1, 
+                                  intensity_attr='height') -> list:
+        '''
+        Correspondence of per-sample peaks into features, as in XCMS or MZmine workflows.
+        Peaks in Sample.list_peaks of all samples in ordered_samples are clustered in (mz, rtime) 
+        by processing.cluster_peaks, in O(n log n).
+        Each cluster becomes a Feature, with mz and rtime as mean of member peaks and list_peaks of the member peaks.
+        The intensity matrix is set as feature_DataFrame, columns 'id_number', 'mz', 'rtime', 
+        then one column per sample (Sample.name, or Sample.id if no name), 
+        taking the most intense peak if a sample has more than one in a feature.
+
+        Args:
+            mz_tolerance_ppm (float): m/z tolerance in ppm between neighboring peaks
+            rt_tolerance (float): retention time tolerance between neighboring peaks
+            min_samples (int): minimal number of samples for a feature to be kept
+            intensity_attr (str): Peak attribute for intensity; max of Peak.list_intensity if not present
+
+        Returns:
+            list: the Features, in order of feature_DataFrame rows
+        '''
+        self.get_sample_cache()
+        samples = [s for s in self.ordered_samples if isinstance(s, Sample)]
+        peaks, sample_index = [], []
+        for ii, sample in enumerate(samples):
+            for peak in sample.list_peaks:
+                if isinstance(peak, Peak) and peak.mz is not None and peak.rtime is not None:
+                    peaks.append(peak)
+                    sample_index.append(ii)
+        sample_index = np.array(sample_index, dtype=np.intp)
+        mz = np.array([p.mz for p in peaks], dtype=float)
+        rtime = np.array([p.rtime for p in peaks], dtype=float)
+        intensity = np.array([getattr(p, intensity_attr, None) or max(p.list_intensity, default=0) for p in peaks], 
+                             dtype=float)
+        clusters = processing.cluster_peaks(mz, rtime, mz_tolerance_ppm, rt_tolerance)
+
+        number_clusters = clusters.max() + 1 if clusters.size else 0
+        number_peaks = np.bincount(clusters, minlength=number_clusters)
+        matrix = np.zeros((number_clusters, len(samples)))
+        np.maximum.at(matrix, (clusters, sample_index), intensity)
+        present = np.zeros(matrix.shape, dtype=bool)
+        present[clusters, sample_index] = True
+        kept = np.flatnonzero(present.sum(axis=1) >= min_samples)
+        feature_mz = np.bincount(clusters, mz, number_clusters)[kept] / number_peaks[kept]
+        feature_rtime = np.bincount(clusters, rtime, number_clusters)[kept] / number_peaks[kept]
+
+        # split peaks by cluster in one pass
+        order = np.argsort(clusters, kind='stable')
+        bounds = np.concatenate([[0], np.cumsum(number_peaks)])
+        features = []
+        for ii, cluster in enumerate(kept):
+            features.append(Feature(
+                id='F%d' %(ii + 1),
+                mz=float(feature_mz[ii]),
+                rtime=float(feature_rtime[ii]),
+                list_peaks=[peaks[jj] for jj in order[bounds[cluster]: bounds[cluster + 1]]],
+                experiment_belonged=self.id,
+            ))
+        self.feature_DataFrame = _dataframe().from_matrix(matrix[kept], columns=[s.name or s.id for s in samples])
+        self.feature_DataFrame.insert(0, 'rtime', feature_rtime)
+        self.feature_DataFrame.insert(0, 'mz', feature_mz)
+        self.feature_DataFrame.insert(0, 'id_number', [f.id for f in features])
+        self.provenance.setdefault('preprocess_parameters', {})['build_features_from_peaks'] = {
+            'mz_tolerance_ppm': mz_tolerance_ppm,
+            'rt_tolerance': rt_tolerance,
+            'min_samples': min_samples,
+        }
+        return features
+
+    def correct_drift(self, frac=0.75, min_QC=4, chunk_size=256) -> dict:
+        '''
+        Correct signal drift over injection order, using QC samples (sample_type 'QC'), per batch (Sample.batch).
+        For each feature, a LOESS curve is fitted over the QC intensities by injection order, 
+        and all samples in the batch are divided by the curve and multiplied by the median of all QC samples,
+        which also removes differences between batches.
+        As LOESS weights only depend on injection order, the fit is a single matrix product for all features
+        (see processing.loess_smoother_matrix), which runs multi-threaded in BLAS. 
+        Rows are processed in chunks, in place. Missing QC values are replaced by the batch QC median of the feature.
+        Sample.injection_order is used if given, else the order in ordered_samples.
+        Parameters are recorded in provenance['preprocess_parameters']['correct_drift'].
+
+        Args:
+            frac (float): fraction of QC samples used in each local fit
+            min_QC (int): minimal number of QC samples in a batch to correct it, at least 4
+            chunk_size (int): used to size row chunks, as number of columns in processing.ChunkedMatrix
+
+        Returns:
+            dict: number of QC samples per batch; batches with fewer than min_QC are not corrected
+        '''
+        matched = self._matched_samples()
+        order = {id(s): ii for ii, s in enumerate(self.ordered_samples)}
+        injection_order = np.array([s.injection_order if s.injection_order is not None else order[id(s)] 
+                                    for s in matched.values()], dtype=float)
+        is_QC = np.array([s.sample_type == 'QC' for s in matched.values()])
+        batches = np.array([s.batch for s in matched.values()])
+        number_QC = processing.correct_drift(
+            processing.ChunkedMatrix(self.feature_DataFrame, list(matched), chunk_size),
+            injection_order, is_QC, batches, frac, min_QC)
+        self.invalidate_sample_type_cache()
+        self.provenance.setdefault('preprocess_parameters', {})['correct_drift'] = {
+            'frac': frac,
+            'min_QC': min_QC,
+            'number_QC_per_batch': number_QC,
+        }
+        return number_QC
+
+    def correct_retention_time(self, anchor_features, method='linear', smoothing=None, min_anchors=5) -> dict:
+        '''
+        Retention time correction of all samples, using anchor features, e.g. high-quality features 
+        present in most samples. For each sample, anchors are (Peak.rtime, Feature.rtime) 
+        of the member peaks (Feature.list_peaks) found in Sample.list_peaks.
+        See Sample.correct_retention_time.
+        Samples with fewer than min_anchors anchors are not corrected.
+
+        Returns:
+            dict: number of anchors per sample id or name
+        '''
+        self.get_sample_cache()
+        samples = [s for s in self.ordered_samples if isinstance(s, Sample)]
+        peak_sample = {id(p): ii for ii, s in enumerate(samples) for p in s.list_peaks}
+        anchors = [([], []) for _ in samples]
+        for feature in anchor_features:
+            for peak in feature.list_peaks:
+                ii = peak_sample.get(id(peak))
+                if ii is not None and peak.rtime is not None:
+                    anchors[ii][0].append(peak.rtime)
+                    anchors[ii][1].append(feature.rtime)
+        number_anchors = {}
+        for sample, (observed, reference) in zip(samples, anchors):
+            number_anchors[sample.id or sample.name] = len(observed)
+            if len(observed) >= min_anchors:
+                sample.correct_retention_time(observed, reference, method, smoothing)
+        self.provenance.setdefault('preprocess_parameters', {})['correct_retention_time'] = {
+            'method': method,
+            'smoothing': smoothing,
+            'min_anchors': min_anchors,
+        }
+        return number_anchors
+
+    def group_features_to_empCpds(self, mode='pos', mz_deltas=None, mz_tolerance_ppm=5, rt_tolerance=2,
+                                  keep_singletons=False, id_column='id_number') -> list:
+        '''
+        Pre-annotation: group co-eluting features related by isotope/adduct m/z differences into EmpiricalCompounds.
+        Features are read from feature_DataFrame (columns id_column, 'mz' and 'rtime').
+        Pairs are found by processing.find_mz_delta_pairs, then connected into groups.
+        In each group, the anchor ion (M+H[1+] in pos mode, M-H[1-] in neg mode) is the feature with most partners, 
+        and neutral_base_mass is computed from it. 
+        The resulting EmpiricalCompounds are set as List_of_empCpds, 
+        with MS1_pseudo_Spectra as list of {'id', 'mz', 'rtime', 'ion_relation'}.
+
+        Args:
+            mode (str): 'pos' or 'neg', for anchor ion and default m/z differences
+            mz_deltas (list): list of (m/z difference to anchor ion, ion_relation), 
+                default to processing.default_mz_deltas[mode]
+            mz_tolerance_ppm (float): m/z tolerance in ppm
+            rt_tolerance (float): maximal retention time difference within a group
+            keep_singletons (bool): also make EmpiricalCompounds of features without partners
+            id_column (str): column of feature IDs in feature_DataFrame; index is used if not a column
+
+        Returns:
+            list: the EmpiricalCompounds
+        '''
+        mz_deltas = mz_deltas or processing.default_mz_deltas[mode]
+        anchor_ion, charge_shift = {'pos': ('M+H[1+]', -processing.PROTON), 'neg': ('M-H[1-]', processing.PROTON)}[mode]
+        df = self.feature_DataFrame
+        ids = df[id_column].to_numpy() if id_column in df.columns else df.index.to_numpy()
+        mz, rtime = df['mz'].to_numpy(dtype=float), df['rtime'].to_numpy(dtype=float)
+        anchors, partners, deltas = processing.find_mz_delta_pairs(
+            mz, rtime, [x[0] for x in mz_deltas], mz_tolerance_ppm, rt_tolerance)
+        groups = processing.connected_groups(len(mz), anchors, partners)
+        number_partners = np.bincount(anchors, minlength=len(mz))
+
+        members = {}
+        for ii in np.lexsort((mz, groups)).tolist():
+            members.setdefault(groups[ii], []).append(ii)
+        relations = {}
+        for a, p, d in zip(anchors.tolist(), partners.tolist(), deltas.tolist()):
+            relations.setdefault((a, p), mz_deltas[d][1])
+
+        empCpds = []
+        for group in members.values():
+            if len(group) < 2 and not keep_singletons:
+                continue
+            anchor = max(group, key=lambda x: number_partners[x])
+            pseudo_spectrum = [{
+                'id': ids[ii].item() if hasattr(ids[ii], 'item') else ids[ii],
+                'mz': float(mz[ii]),
+                'rtime': float(rtime[ii]),
+                'ion_relation': anchor_ion if ii == anchor else relations.get((anchor, ii), ''),
+            } for ii in group]
+            empCpds.append(EmpiricalCompound(
+                id='E%d' %(len(empCpds) + 1),
+                experiment_belonged=self.id,
+                annotation_method='group_features_to_empCpds',
+                neutral_base_mass=float(mz[anchor] + charge_shift),
+                MS1_pseudo_Spectra=pseudo_spectrum,
+                list_features=[x['id'] for x in pseudo_spectrum],
+            ))
+        self.List_of_empCpds = empCpds
+        return empCpds
+
+    def get_sample_cache(self) -> SampleCache:
+        '''
+        The LRU cache of lazily loaded data of samples in this experiment, created on first use.
+        The cache is given to samples in ordered_samples as a private attribute, 
+        so that samples do not need a reference back to the Experiment.
+        Use set_sample_cache_size to change its size.
+        '''
+        if getattr(self, '_sample_cache', None) is None:
+            self._sample_cache = SampleCache()
+        for sample in self.ordered_samples:
+            if isinstance(sample, Sample):
+                sample._sample_cache = self._sample_cache
+        return self._sample_cache
+
+    def set_sample_cache_size(self, max_bytes):
+        cache = self.get_sample_cache()
+        cache.max_bytes = max_bytes
+        cache.shrink()
+
+    def remove_empCpd_features(self, feature_ids):
+        '''
+        Remove references to feature_ids from list_features and MS1_pseudo_Spectra of List_of_empCpds,
+        which can be EmpiricalCompound objects or dicts. EmpCpds left without features are removed.
+        '''
+        if not feature_ids:
+            return
+        kept = []
+        for empCpd in self.List_of_empCpds:
+            is_dict = isinstance(empCpd, dict)
+            number_refs = 0
+            for attr in ('list_features', 'MS1_pseudo_Spectra'):
+                refs = empCpd.get(attr, []) if is_dict else getattr(empCpd, attr, [])
+                refs = [x for x in refs if _feature_ref_id(x) not in feature_ids]
+                number_refs += len(refs)
+                if is_dict:
+                    if attr in empCpd:
+                        empCpd[attr] = refs
+                else:
+                    setattr(empCpd, attr, refs)
+            if number_refs:
+                kept.append(empCpd)
+        self.List_of_empCpds = kept
 
 @dataclass
 class Method(metDataMember):
@@ -261,6 +1111,91 @@ class Method(metDataMember):
         'ionization': ''
     })
 
+def _estimate_bytes(obj) -> int:
+    '''
+    Approximate memory size of loaded sample data, counting arrays, lists, dicts and object attributes.
+    '''
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    elif isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(_estimate_bytes(x) for x in obj)
+    elif isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(_estimate_bytes(k) + _estimate_bytes(v) for k, v in obj.items())
+    elif hasattr(obj, '__dict__'):
+        return sys.getsizeof(obj) + _estimate_bytes(vars(obj))
+    return sys.getsizeof(obj)
+
+
+class SampleCache:
+    '''
+    LRU cache of lazily loaded Sample data (list_MassTracks, list_peaks), bounded by approximate bytes.
+    When over max_bytes, least recently used samples are evicted; they are reloaded from 
+    Sample.data_location on next access. An Experiment has one cache for its samples, see Experiment.get_sample_cache.
+    Data modified in place must be kept on the Sample with Sample.keep_loaded_data, or changes are lost on eviction.
+    '''
+    def __init__(self, max_bytes=2 ** 30):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        # id(sample) -> (sample, data, bytes); the sample is referenced so that its id is not reused
+        self.entries = OrderedDict()
+
+    def get(self, sample, name):
+        key = id(sample)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key][1][name]
+        data = sample.load_data()
+        size = _estimate_bytes(data)
+        self.entries[key] = (sample, data, size)
+        self.bytes += size
+        self.shrink()
+        return data[name]
+
+    def shrink(self):
+        '''Evict least recently used samples until within max_bytes, always keeping the last one.'''
+        while self.bytes > self.max_bytes and len(self.entries) > 1:
+            _, _, evicted_size = self.entries.popitem(last=False)[1]
+            self.bytes -= evicted_size
+
+    def evict(self, sample):
+        '''Remove a sample, returning its loaded data or None.'''
+        entry = self.entries.pop(id(sample), None)
+        if entry:
+            self.bytes -= entry[2]
+            return entry[1]
+        return None
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+default_sample_cache = SampleCache()
+
+
+class _LazySampleData:
+    '''
+    Descriptor for Sample.list_MassTracks and Sample.list_peaks. 
+    A value given in the constructor or by assignment is kept on the Sample (and serialized). 
+    Otherwise, if Sample.data_location is given, the value is loaded on first access 
+    and kept in the sample's SampleCache, which may evict it; if not, it defaults to an empty list.
+    '''
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, sample, owner=None):
+        if sample is None:
+            return None         # dataclass default, meaning not set
+        if self.name in sample.__dict__:
+            return sample.__dict__[self.name]
+        if getattr(sample, 'data_location', ''):
+            return sample.get_sample_cache().get(sample, self.name)
+        return sample.__dict__.setdefault(self.name, [])
+
+    def __set__(self, sample, value):
+        # None is the dataclass default, meaning not given; see Sample.__post_init__
+        if value is not None:
+            sample.__dict__[self.name] = value
+
 @dataclass
 class Sample(metDataMember):
     '''
@@ -274,7 +1209,7 @@ class Sample(metDataMember):
         self.rt_numbers = registry['list_scan_numbers']
     '''
     experiment: Union[str, Experiment] = ''
-    registry: dict = field(default_factory={
+    registry: dict = field(default_factory=lambda: {
             "input_file": '',
             "name": '',
             "sample_id": '',
@@ -287,8 +1222,107 @@ class Sample(metDataMember):
     name: str = ''
     id: str = ''
     list_retention_time: list[str, float] = field(default_factory=dict)
-    list_MassTracks: list[str] = field(default_factory=list)
-    list_peaks: list[str, Peak] = field(default_factory=list)
+    # loaded lazily from data_location if not given, see _LazySampleData
+    list_MassTracks: list[str] = _LazySampleData()
+    list_peaks: list[str, Peak] = _LazySampleData()
+    # fields added later are kept at the end, so that positional arguments stay the same
+    batch: str = ''
+    injection_order: int = None
+    data_location: str = ''
+
+    def __post_init__(self):
+        if not self.data_location:
+            self.__dict__.setdefault('list_MassTracks', [])
+            self.__dict__.setdefault('list_peaks', [])
+
+    def get_sample_cache(self) -> SampleCache:
+        '''
+        The cache of lazily loaded data: given by Experiment.get_sample_cache to its samples,
+        or of self.experiment if it is an Experiment, else default_sample_cache.
+        '''
+        cache = getattr(self, '_sample_cache', None)
+        if cache is not None:
+            return cache
+        if isinstance(self.experiment, Experiment):
+            return self.experiment.get_sample_cache()
+        return default_sample_cache
+
+    def keep_loaded_data(self):
+        '''
+        Move lazily loaded list_MassTracks and list_peaks from the cache onto this Sample, 
+        so that changes to them are kept (and serialized) rather than lost when the sample is evicted.
+        The same objects are kept, loading them if not in the cache.
+        '''
+        if not self.data_location or ('list_MassTracks' in self.__dict__ and 'list_peaks' in self.__dict__):
+            return
+        cache = self.get_sample_cache()
+        data = cache.evict(self) or self.load_data()
+        for name in ('list_MassTracks', 'list_peaks'):
+            self.__dict__.setdefault(name, data[name])
+
+    # repr and == read fields from __dict__, so that they do not load data_location; 
+    # lazy fields not loaded are shown as such, and compared by data_location
+    @reprlib.recursive_repr()
+    def __repr__(self):
+        values = self.__dict__
+        return '%s(%s)' %(type(self).__name__, ', '.join(
+            '%s=%s' %(f.name, repr(values[f.name]) if f.name in values else '<not loaded>') 
+            for f in fields(self) if f.repr))
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        missing = object()
+        return all(self.__dict__.get(f.name, missing) == other.__dict__.get(f.name, missing)
+                   for f in fields(self) if f.compare)
+
+    def load_data(self) -> dict:
+        '''
+        Load list_MassTracks and list_peaks from data_location. Derived classes can override for other formats.
+        A .json file is read as written by metDataMember.dump of a Sample;
+        other files are read as pickle in asari format, i.e. a dict with 'list_mass_tracks' 
+        of {'id_number', 'mz', 'intensity'}, which are converted to MassTracks.
+        '''
+        if self.data_location.endswith('.json'):
+            with open(self.data_location) as O:
+                data = metDataMember.deserialize(json.load(O))
+            data = data.__dict__ if isinstance(data, metDataMember) else data
+            return {'list_MassTracks': data.get('list_MassTracks', []), 'list_peaks': data.get('list_peaks', [])}
+        with open(self.data_location, 'rb') as O:
+            data = pickle.load(O)
+        return {
+            'list_MassTracks': [MassTrack(id=t['id_number'], mz=t['mz'], list_intensity=t['intensity']) 
+                                for t in data.get('list_mass_tracks', [])],
+            'list_peaks': data.get('list_peaks', []),
+        }
+
+    def correct_retention_time(self, observed, reference, method='linear', smoothing=None):
+        '''
+        Fit a retention time warping model from anchors, observed rtime in this sample to reference rtime,
+        and apply it to list_retention_time of all Peaks and MassTracks of this sample in one vectorized call.
+        Results are written to list_retention_time_corrected of each object.
+        Lazily loaded data is first kept on the Sample (see keep_loaded_data), so that results are not lost on eviction.
+        The model is kept as self._rt_model (not serialized).
+
+        Args:
+            observed (list): rtime of anchors in this sample
+            reference (list): reference rtime of the same anchors, e.g. Feature.rtime
+            method (str): 'linear' for piecewise-linear, or 'spline' for smoothing spline (requires scipy)
+            smoothing (float): smoothing factor for 'spline', see scipy.interpolate.UnivariateSpline
+
+        Returns:
+            function: the model, mapping an array of rtime to corrected rtime
+        '''
+        self._rt_model = processing.fit_rt_warping(observed, reference, method, smoothing)
+        self.keep_loaded_data()
+        members = [x for x in self.list_peaks + self.list_MassTracks if isinstance(x, (Peak, MassTrack))]
+        lengths = [len(x.list_retention_time) for x in members]
+        if members and sum(lengths):
+            corrected = self._rt_model(np.concatenate([np.asarray(x.list_retention_time, dtype=float) 
+                                                       for x in members]))
+            for member, values in zip(members, np.split(corrected, np.cumsum(lengths)[:-1])):
+                member.list_retention_time_corrected = values.tolist()
+        return self._rt_model
 
 @dataclass
 class Spectrum(metDataMember):
@@ -319,6 +1353,26 @@ class Spectrum(metDataMember):
     precursor_ion_mz: float = field(default=None)
     retention_time: float = field(default=None)
     rtime: float = field(default=None)
+    list_mz: list[float] = field(default_factory=list)
+    list_intensity: list[float] = field(default_factory=list)
+
+    def content_hash(self, mz_decimals=3, intensity_decimals=0) -> str:
+        '''
+        Stable hash over precursor, ionization, ms_level and quantized peaks,
+        so that near-identical spectra from different libraries share a hash.
+        Peaks are sorted by m/z, m/z rounded to mz_decimals, 
+        and intensity is scaled to percent of the base peak and rounded to intensity_decimals.
+        id, retention time and other metadata are not included.
+        '''
+        precursor = self.precursor_ion_mz if self.precursor_ion_mz is not None else self.precursor_ion
+        if precursor is not None:
+            precursor = round(precursor, mz_decimals)
+        base = max(self.list_intensity, default=0) or 1
+        peaks = sorted(
+            (round(mz, mz_decimals), round(100 * intensity / base, intensity_decimals))
+            for mz, intensity in zip(self.list_mz, self.list_intensity)
+        )
+        return _content_hash([self.ms_level, self.ionization, precursor, peaks])
 
 
 @dataclass
@@ -393,6 +1447,7 @@ class MassTrack(metDataMember):
     mz: float = field(default=None)
     list_retention_time: list[str, float, int] = field(default_factory=list)
     list_intensity : list[str, float, int] = field(default_factory=list)
+    list_retention_time_corrected : list[float, str] = field(default_factory=list)
 
 
 @dataclass
@@ -532,6 +1587,16 @@ class Compound(metDataMember):
     SMILES: str = ''
     inchi: str = ''
 
+    def content_hash(self) -> str:
+        '''
+        Stable hash over neutral_formula, inchi and SMILES.
+        Returns None unless inchi or SMILES is given, as a formula alone is shared by isomers.
+        '''
+        structure = [(x or '').strip() for x in (self.neutral_formula, self.inchi, self.SMILES)]
+        if not (structure[1] or structure[2]):
+            return None
+        return _content_hash(structure)
+
 @dataclass
 class Reaction(metDataMember):
     '''
@@ -660,4 +1725,8 @@ def __test_deserialize_serialize():
         } # test dict of objects as datamember
     serialized = x.serialize() # serialize the object
     deserialized = metDataMember.deserialize(serialized) # now deserialize
-    assert serialized == deserialized.serialize() # check that serializations are equal
\ No newline at end of file
+    assert serialized == deserialized.serialize() # check that serializations are equal
+
+if os.environ.get('METDATAMODEL_PROFILE', '') not in ('', '0'):
+    from metDataModel import instrumentation
+    instrumentation._enable_from_environment()
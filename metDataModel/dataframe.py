@@ -0,0 +1,35 @@
+'''
+pandas adapter for metDataModel.core.
+
+metDataModel.core does not import pandas, so that the models can be used in short-lived workers 
+and CLI tools without its import cost. DataFrames are created here, and this module is imported 
+on first use, e.g. when Experiment.feature_DataFrame is accessed or a processing step returns a table.
+'''
+
+import pandas as pd
+
+DataFrame = pd.DataFrame
+
+
+def empty() -> pd.DataFrame:
+    return pd.DataFrame()
+
+def from_columns(columns, index=None) -> pd.DataFrame:
+    '''
+    Args:
+        columns (dict): column name to array or list
+        index: optional index, e.g. of feature_DataFrame
+    '''
+    return pd.DataFrame(columns, index=index)
+
+def from_matrix(matrix, columns, index=None) -> pd.DataFrame:
+    '''
+    Args:
+        matrix (np.ndarray): 2-D array, e.g. features x samples
+        columns (list): column names
+        index: optional index
+    '''
+    return pd.DataFrame(matrix, columns=columns, index=index)
+
+def is_DataFrame(obj) -> bool:
+    return isinstance(obj, pd.DataFrame)
@@ -9,7 +9,7 @@ For Further annotation models - see khipu
 Note that examples are dataclasses; however, regular classes can inherit from dataclasses too.
 """
 
-from metDataModel.core import Experiment, Compound, EmpiricalCompound, Feature, Spectrum, ArrayOfSpectra, serializable_primitive_type, serializable_type
+from metDataModel.core import Experiment, Compound, EmpiricalCompound, Feature, Spectrum, ArrayOfSpectra, serializable_primitive_type, serializable_type, deduplicate
 from dataclasses import dataclass, field
 from typing import Union
 
@@ -53,6 +53,38 @@ class Compound_spectra(Compound):
     MS2_CID_pos : spectral_array_type = field(default_factory=lambda: [])
     MS2_CID_neg : spectral_array_type = field(default_factory=lambda: [])
 
+spectral_fields = ['MS1_ESI_pos', 'MS1_ESI_neg', 'MS1_EISA_pos', 'MS1_EISA_neg', 
+                   'MS1_GC_pos', 'MS1_GC_neg', 'MS2_CID_pos', 'MS2_CID_neg']
+
+def merge_Compound_spectra(list_compounds):
+    '''
+    Collapse duplicate Compound_spectra from merged libraries (e.g. MoNA and HMDB) in one hashed pass.
+    Compounds are matched by Compound.content_hash; the first occurrence is kept, 
+    with db_ids and spectra of later duplicates added to it.
+    Spectra in each spectral field are then deduplicated by Spectrum.content_hash.
+    Compounds without inchi or SMILES are kept as they are, as isomers share a formula.
+    Note that the first occurrences are modified in place.
+    '''
+    merged, result = {}, []
+    for cpd in list_compounds:
+        key = cpd.content_hash()
+        if key is None:
+            result.append(cpd)
+        elif key not in merged:
+            merged[key] = cpd
+            result.append(cpd)
+        else:
+            kept = merged[key]
+            kept.db_ids += [x for x in cpd.db_ids if x not in kept.db_ids]
+            for f in spectral_fields:
+                if isinstance(getattr(kept, f), list):
+                    getattr(kept, f).extend(getattr(cpd, f))
+    for cpd in merged.values():
+        for f in spectral_fields:
+            if isinstance(getattr(cpd, f), list):
+                setattr(cpd, f, deduplicate(getattr(cpd, f)))
+    return result
+
 @dataclass
 class Contaminant:
     '''
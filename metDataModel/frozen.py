@@ -0,0 +1,160 @@
+'''
+Frozen, hashable variants of core classes, e.g. for dict keys, memoization,
+and sharing between threads without locks or defensive copies.
+
+FrozenFeature, FrozenPeak and FrozenEmpiricalCompound have the same fields as Feature, Peak and EmpiricalCompound.
+Field values are frozen recursively: lists become tuples, dicts become FrozenDicts,
+and nested objects (e.g. Peaks in Feature.list_peaks) their frozen variants.
+Equality is by class and field values; the hash is computed on first use and cached.
+Frozen variants of other core classes are made on demand by frozen_class.
+
+Example:
+    frozen_features = freeze_all(list_features)
+    cache = {f: annotate(f) for f in frozen_features}
+    feature = frozen_features[0].thaw()     # a new, mutable Feature
+'''
+
+import dataclasses
+
+from metDataModel import core
+
+
+class FrozenDict(dict):
+    '''
+    Immutable, hashable dict. As a dict subclass, it is read and serialized as a dict.
+    '''
+    def __hash__(self):
+        return hash(frozenset(self.items()))
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("FrozenDict is immutable.")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _immutable
+    __ior__ = _immutable
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def _freeze_value(value):
+    if isinstance(value, (str, int, float)) or value is None:
+        return value
+    elif isinstance(value, (list, tuple)):
+        return tuple(_freeze_value(x) for x in value)
+    elif isinstance(value, dict):
+        return value if isinstance(value, FrozenDict) else FrozenDict(
+            {_freeze_value(k): _freeze_value(v) for k, v in value.items()})
+    elif isinstance(value, core.metDataMember):
+        return freeze(value)
+    return value
+
+def _thaw_value(value):
+    if isinstance(value, (str, int, float)) or value is None:
+        return value
+    elif isinstance(value, tuple):
+        return [_thaw_value(x) for x in value]
+    elif isinstance(value, dict):
+        return {k: _thaw_value(v) for k, v in value.items()}
+    elif isinstance(value, _FrozenMember):
+        return value.thaw()
+    return value
+
+
+class _FrozenMember:
+    '''
+    Methods shared by frozen variants. The fields are those of mutable_class,
+    stored in __dict__ so that conversion sets one dict instead of each field.
+    '''
+    mutable_class = None
+    _field_names = ()
+
+    def __post_init__(self):
+        for name in self._field_names:
+            self.__dict__[name] = _freeze_value(self.__dict__[name])
+
+    def _values(self):
+        values = self.__dict__
+        return tuple(values[name] for name in self._field_names)
+
+    def __hash__(self):
+        try:
+            return self.__dict__['_hash']
+        except KeyError:
+            # a race between threads only computes the same value twice
+            result = self.__dict__['_hash'] = hash((type(self), self._values()))
+            return result
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if type(other) is not type(self) or hash(other) != hash(self):
+            return False
+        return self._values() == other._values()
+
+    def __reduce__(self):
+        return (_new_frozen, (type(self).mutable_class, {n: self.__dict__[n] for n in self._field_names}))
+
+    def thaw(self) -> core.metDataMember:
+        '''
+        Return a new mutable object of mutable_class, with lists and dicts in place of tuples and FrozenDicts.
+        '''
+        obj = self.mutable_class.__new__(self.mutable_class)
+        obj.__dict__ = {name: _thaw_value(self.__dict__[name]) for name in self._field_names}
+        return obj
+
+    def serialize(self) -> dict:
+        '''
+        Serialize as the mutable class, so that metDataMember.deserialize returns a mutable object.
+        '''
+        return self.thaw().serialize()
+
+
+_frozen_classes = {}
+
+def frozen_class(cls) -> type:
+    '''
+    Return the frozen variant of a metDataMember dataclass, creating it on first use.
+    '''
+    if cls not in _frozen_classes:
+        fields = [(f.name, f.type, dataclasses.field(default=f.default, default_factory=f.default_factory))
+                  for f in dataclasses.fields(cls)]
+        frozen = dataclasses.make_dataclass('Frozen' + cls.__name__, fields, bases=(_FrozenMember,),
+                                            frozen=True, eq=False, namespace={
+                                                'mutable_class': cls,
+                                                '_field_names': tuple(name for name, _, _ in fields),
+                                                '__module__': __name__,
+                                                '__doc__': 'Frozen, hashable variant of %s.' %cls.__name__,
+                                            })
+        _frozen_classes[cls] = frozen
+    return _frozen_classes[cls]
+
+def _new_frozen(cls, values):
+    frozen = frozen_class(cls)
+    obj = frozen.__new__(frozen)
+    obj.__dict__.update(values)
+    return obj
+
+
+FrozenFeature = frozen_class(core.Feature)
+FrozenPeak = frozen_class(core.Peak)
+FrozenEmpiricalCompound = frozen_class(core.EmpiricalCompound)
+
+
+def freeze(obj) -> _FrozenMember:
+    '''
+    Return the frozen variant of a metDataMember object. Frozen objects are returned as they are.
+    Fields not declared in the class, e.g. added by users, are not kept.
+    '''
+    if isinstance(obj, _FrozenMember):
+        return obj
+    values = obj.__dict__
+    frozen = frozen_class(type(obj))
+    new = frozen.__new__(frozen)
+    new.__dict__.update({name: _freeze_value(values[name]) for name in frozen._field_names if name in values})
+    return new
+
+def freeze_all(objects) -> list:
+    return [freeze(obj) for obj in objects]
+
+def thaw_all(objects) -> list:
+    return [obj.thaw() for obj in objects]
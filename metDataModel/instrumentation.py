@@ -0,0 +1,248 @@
+'''
+Opt-in instrumentation of serialization and loading in metDataModel.core.
+
+When enabled, methods of metDataMember and Sample are replaced by timing wrappers, 
+which record per class: number of objects, cumulative time and bytes of JSON/YAML text.
+When disabled, the original methods are restored, so there is no overhead at all.
+
+Usage:
+    from metDataModel import instrumentation
+    with instrumentation.profiling() as stats:
+        experiment = metDataMember.load(open('experiment.json'))
+    print(stats.report())
+
+Or set environment variable METDATAMODEL_PROFILE=1 before importing metDataModel.core,
+and a report is printed to stderr at exit.
+
+Times are inclusive, e.g. serialize of an Experiment includes serialize of its nested Features,
+which are also recorded under Feature. Nested objects restored by deserialize are not recorded separately.
+'''
+
+import sys
+import time
+import threading
+import inspect
+import contextlib
+from collections import defaultdict
+
+from metDataModel import core
+
+
+class ProfileStats:
+    '''
+    Records of (operation, class name) -> [calls, objects, seconds, bytes].
+    '''
+    def __init__(self):
+        self.records = defaultdict(lambda: [0, 0, 0.0, 0])
+        self._lock = threading.Lock()
+
+    def add(self, operation, class_name, seconds, number_objects=1, number_bytes=0):
+        with self._lock:
+            record = self.records[(operation, class_name)]
+            record[0] += 1
+            record[1] += number_objects
+            record[2] += seconds
+            record[3] += number_bytes
+
+    def reset(self):
+        with self._lock:
+            self.records.clear()
+
+    def to_dict(self) -> dict:
+        '''
+        Returns:
+            dict: {operation: {class name: {'calls', 'objects', 'seconds', 'bytes'}}}
+        '''
+        result = {}
+        with self._lock:
+            for (operation, class_name), (calls, objects, seconds, number_bytes) in sorted(self.records.items()):
+                result.setdefault(operation, {})[class_name] = {
+                    'calls': calls, 'objects': objects, 'seconds': seconds, 'bytes': number_bytes}
+        return result
+
+    def report(self, sort_by='seconds') -> str:
+        '''
+        Text table of records, sorted by sort_by in 'calls', 'objects', 'seconds', 'bytes'.
+        '''
+        column = ['calls', 'objects', 'seconds', 'bytes'].index(sort_by)
+        with self._lock:
+            rows = sorted(self.records.items(), key=lambda x: x[1][column], reverse=True)
+        lines = ['%-18s %-22s %10s %10s %12s %14s' %('operation', 'class', 'calls', 'objects', 'seconds', 'bytes')]
+        for (operation, class_name), (calls, objects, seconds, number_bytes) in rows:
+            lines.append('%-18s %-22s %10d %10d %12.6f %14d' %(operation, class_name, calls, objects, seconds, number_bytes))
+        return '\n'.join(lines)
+
+
+stats = ProfileStats()
+_originals = {}
+_depth = 0
+_depth_lock = threading.Lock()
+
+
+def _class_name(obj):
+    if isinstance(obj, list):
+        return (type(obj[0]).__name__ if obj else 'empty') + '[]'
+    return type(obj).__name__
+
+def _number_objects(obj):
+    return len(obj) if isinstance(obj, list) else 1
+
+def _text_bytes(text):
+    return len(text) if isinstance(text, (str, bytes)) else 0
+
+def _tell(fp):
+    try:
+        return fp.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+def _file_bytes(fp, start):
+    end = _tell(fp)
+    return end - start if start is not None and end is not None else 0
+
+
+def _wrap_serialize(operation, method):
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        result = method(self, *args, **kwargs)
+        stats.add(operation, type(self).__name__, time.perf_counter() - start, 1, _text_bytes(result))
+        return result
+    return wrapper
+
+def _wrap_deserialize(operation, method):
+    def wrapper(serialized, *args, **kwargs):
+        start = time.perf_counter()
+        result = method(serialized, *args, **kwargs)
+        stats.add(operation, _class_name(result), time.perf_counter() - start, 
+                  _number_objects(result), _text_bytes(serialized))
+        return result
+    return wrapper
+
+def _wrap_dump(operation, method):
+    def wrapper(self, fp, *args, **kwargs):
+        position, start = _tell(fp), time.perf_counter()
+        result = method(self, fp, *args, **kwargs)
+        stats.add(operation, type(self).__name__, time.perf_counter() - start, 1, _file_bytes(fp, position))
+        return result
+    return wrapper
+
+def _wrap_bulk_dump(operation, method):
+    def wrapper(list_members, fp, *args, **kwargs):
+        seen = {'class': 'empty[]', 'number': 0}
+        def counted(members):
+            for member in members:
+                if not seen['number']:
+                    seen['class'] = type(member).__name__ + '[]'
+                seen['number'] += 1
+                yield member
+        position, start = _tell(fp), time.perf_counter()
+        result = method(counted(list_members), fp, *args, **kwargs)
+        stats.add(operation, seen['class'], time.perf_counter() - start, seen['number'], _file_bytes(fp, position))
+        return result
+    return wrapper
+
+def _wrap_load(operation, method):
+    def wrapper(fp, *args, **kwargs):
+        position, start = _tell(fp), time.perf_counter()
+        result = method(fp, *args, **kwargs)
+        stats.add(operation, _class_name(result), time.perf_counter() - start, 
+                  _number_objects(result), _file_bytes(fp, position))
+        return result
+    return wrapper
+
+def _wrap_sample_loader(operation, method):
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        result = method(self, *args, **kwargs)
+        stats.add(operation, type(self).__name__, time.perf_counter() - start, 
+                  sum(len(x) for x in result.values()))
+        return result
+    return wrapper
+
+
+# (owner, attribute, wrapper factory)
+instrumented_methods = [
+    (core.metDataMember, 'serialize', _wrap_serialize),
+    (core.metDataMember, 'serialize_graph', _wrap_serialize),
+    (core.metDataMember, 'to_JSON', _wrap_serialize),
+    (core.metDataMember, 'to_YAML', _wrap_serialize),
+    (core.metDataMember, 'deserialize', _wrap_deserialize),
+    (core.metDataMember, 'bulk_deserialize', _wrap_deserialize),
+    (core.metDataMember, 'from_JSON', _wrap_deserialize),
+    (core.metDataMember, 'from_YAML', _wrap_deserialize),
+    (core.metDataMember, 'dump', _wrap_dump),
+    (core.metDataMember, 'bulk_dump', _wrap_bulk_dump),
+    (core.metDataMember, 'load', _wrap_load),
+    (core.Sample, 'load_data', _wrap_sample_loader),
+]
+
+
+def enable():
+    '''
+    Install timing wrappers. Calls can be nested; methods are restored after the matching number of disable().
+    '''
+    global _depth
+    with _depth_lock:
+        _depth += 1
+        if _depth > 1:
+            return
+        for owner, name, factory in instrumented_methods:
+            original = inspect.getattr_static(owner, name)
+            _originals[(owner, name)] = original
+            if isinstance(original, staticmethod):
+                setattr(owner, name, staticmethod(factory(name, original.__func__)))
+            else:
+                setattr(owner, name, factory(name, original))
+
+def disable():
+    '''
+    Restore the original methods.
+    '''
+    global _depth
+    with _depth_lock:
+        if _depth == 0:
+            return
+        _depth -= 1
+        if _depth:
+            return
+        for (owner, name), original in _originals.items():
+            setattr(owner, name, original)
+        _originals.clear()
+
+def is_enabled() -> bool:
+    return _depth > 0
+
+def reset():
+    stats.reset()
+
+def get_stats() -> dict:
+    return stats.to_dict()
+
+def report(sort_by='seconds') -> str:
+    return stats.report(sort_by)
+
+
+@contextlib.contextmanager
+def profiling(reset_stats=True):
+    '''
+    Context manager to record serialization and loading within the block.
+
+    Args:
+        reset_stats (bool): clear previous records first
+
+    Yields:
+        ProfileStats: the module stats, with report() and to_dict()
+    '''
+    if reset_stats:
+        stats.reset()
+    enable()
+    try:
+        yield stats
+    finally:
+        disable()
+
+
+def _enable_from_environment():
+    import atexit
+    enable()
+    atexit.register(lambda: sys.stderr.write(report() + '\n'))
@@ -0,0 +1,436 @@
+'''
+Array-level data processing on intensity matrices, features in rows and samples in columns.
+These are used by methods of core.Experiment, but work on any 2-D numpy array, 
+numpy.memmap or pandas DataFrame.
+
+Large matrices are processed in chunks of columns (or rows where needed), 
+so that peak memory stays bounded by chunk size rather than matrix size.
+'''
+
+import numpy as np
+
+
+class ChunkedMatrix:
+    '''
+    Chunked in-place access to selected columns of a 2-D array, memmap or DataFrame.
+    For arrays, chunks are views when columns are contiguous, and written back only if copied.
+    For DataFrames, chunks are copied in the float dtype of their columns (float32 stays float32),
+    and written back by position, cast to the dtype of each column.
+    Integer or boolean columns of a DataFrame, e.g. integer intensity tables, are converted to float64 in place first;
+    arrays must have a floating point dtype, as values are written back in the array's own dtype.
+    '''
+    def __init__(self, data, columns=None, chunk_size=256):
+        self.data = data
+        self.is_DataFrame = hasattr(data, 'iloc')
+        self.number_rows = data.shape[0]
+        if columns is None:
+            columns = np.arange(data.shape[1])
+        self.columns = np.asarray(columns, dtype=np.intp)
+        self.chunk_size = chunk_size
+        if self.is_DataFrame:
+            for position in self.columns.tolist():
+                if data.dtypes.iloc[position].kind in 'iub':
+                    data.isetitem(position, data.iloc[:, position].astype(np.float64))
+            self.dtypes = np.array([data.dtypes.iloc[ii] for ii in range(data.shape[1])], dtype=object)
+            for position in self.columns.tolist():
+                if self.dtypes[position].kind != 'f':
+                    raise TypeError("Column %s is not numeric, dtype %s." %(data.columns[position], self.dtypes[position]))
+        elif np.asarray(data[:0]).dtype.kind != 'f':
+            raise TypeError("ChunkedMatrix requires a floating point array, got %s; convert with astype(float)."
+                            %np.asarray(data[:0]).dtype)
+
+    def _positions(self, cols):
+        return np.arange(self.data.shape[1])[cols]
+
+    def _read(self, rows, cols):
+        if self.is_DataFrame:
+            dtype = np.result_type(*self.dtypes[self._positions(cols)])
+            return self.data.iloc[rows, cols].to_numpy(dtype=dtype, copy=True)
+        return self.data[rows, cols]
+
+    def _write_DataFrame(self, rows, cols, block):
+        positions = self._positions(cols)
+        dtypes = self.dtypes[positions]
+        for dtype in dict.fromkeys(dtypes.tolist()):
+            selected = np.flatnonzero(dtypes == dtype)
+            if len(selected) == len(positions):
+                self.data.iloc[rows, cols] = np.asarray(block, dtype=dtype)
+            else:
+                self.data.iloc[rows, positions[selected]] = np.asarray(block[:, selected], dtype=dtype)
+
+    def _as_index(self, cols):
+        # contiguous positions as slice, to get views from arrays
+        if len(cols) and cols[-1] - cols[0] == len(cols) - 1:
+            return slice(cols[0], cols[-1] + 1)
+        return cols
+
+    def iter_column_chunks(self):
+        '''
+        Yield (cols, block), block being the features x len(cols) values of a column chunk.
+        '''
+        for ii in range(0, len(self.columns), self.chunk_size):
+            cols = self._as_index(self.columns[ii: ii + self.chunk_size])
+            yield cols, self._read(slice(None), cols)
+
+    def iter_row_chunks(self):
+        '''
+        Yield (rows, block) over all selected columns, in chunks of rows.
+        The row chunk is sized to hold about as many values as a column chunk.
+        '''
+        step = max(1, self.chunk_size * self.number_rows // max(1, len(self.columns)))
+        cols = self._as_index(self.columns)
+        for ii in range(0, self.number_rows, step):
+            rows = slice(ii, min(ii + step, self.number_rows))
+            yield rows, self._read(rows, cols)
+
+    def write(self, cols, block):
+        if self.is_DataFrame:
+            self._write_DataFrame(slice(None), cols, block)
+        elif not np.shares_memory(self.data, block):
+            self.data[:, cols] = block
+
+    def write_rows(self, rows, block):
+        '''Write back a block from iter_row_chunks, which can be upcast, e.g. to float64.'''
+        cols = self._as_index(self.columns)
+        if self.is_DataFrame:
+            self._write_DataFrame(rows, cols, block)
+        elif not np.shares_memory(self.data, block):
+            self.data[rows, cols] = block
+
+
+def _scale_columns(matrix, factors):
+    '''
+    Multiply each column by its factor, in place chunk by chunk.
+    '''
+    start = 0
+    for cols, block in matrix.iter_column_chunks():
+        n = block.shape[1]
+        block *= np.asarray(factors[start: start + n], dtype=block.dtype)
+        matrix.write(cols, block)
+        start += n
+
+
+def _positive(block):
+    '''Block as float with non-positive values as NaN, for statistics ignoring missing signal.'''
+    return np.where(block > 0, block, np.nan)
+
+
+def normalize_TIC(matrix):
+    '''
+    Total ion count normalization: each sample is scaled to the median of column sums.
+    Returns scaling factors per column.
+    '''
+    totals = np.concatenate([np.nansum(block, axis=0) for _, block in matrix.iter_column_chunks()])
+    factors = np.median(totals) / totals
+    _scale_columns(matrix, factors)
+    return factors
+
+
+def normalize_median(matrix):
+    '''
+    Median normalization: each sample is scaled so that its median of positive values
+    equals the median of all sample medians.
+    Returns scaling factors per column.
+    '''
+    medians = np.concatenate([np.nanmedian(_positive(block), axis=0) for _, block in matrix.iter_column_chunks()])
+    factors = np.nanmedian(medians) / medians
+    _scale_columns(matrix, factors)
+    return factors
+
+
+def normalize_PQN(matrix):
+    '''
+    Probabilistic quotient normalization (Dieterle et al. 2006, Anal Chem 78:4281).
+    The reference is the median of each feature across samples;
+    each sample is divided by the median of its quotients to the reference. 
+    Non-positive values are ignored. Integral (TIC) normalization is not applied here, 
+    and can be done first by normalize_TIC.
+    Returns scaling factors per column.
+    '''
+    reference = np.concatenate([np.nanmedian(_positive(block), axis=1) for _, block in matrix.iter_row_chunks()])
+    quotients = []
+    for _, block in matrix.iter_column_chunks():
+        with np.errstate(invalid='ignore'):
+            quotients.append(np.nanmedian(_positive(block) / reference[:, None], axis=0))
+    factors = 1 / np.concatenate(quotients)
+    _scale_columns(matrix, factors)
+    return factors
+
+
+def normalize_quantile(matrix):
+    '''
+    Quantile normalization: each sample gets the same distribution, 
+    the mean of sorted values across samples. Ties are assigned by order of appearance.
+    Missing values should be imputed beforehand, as NaN are sorted to the end.
+    Returns the reference distribution.
+    '''
+    total, number_columns = np.zeros(matrix.number_rows), 0
+    for _, block in matrix.iter_column_chunks():
+        total += np.sort(block, axis=0).sum(axis=1)
+        number_columns += block.shape[1]
+    reference = total / max(1, number_columns)
+    for cols, block in matrix.iter_column_chunks():
+        ranks = np.argsort(block, axis=0, kind='stable')
+        np.put_along_axis(block, ranks, reference[:, None].astype(block.dtype), axis=0)
+        matrix.write(cols, block)
+    return reference
+
+
+def benjamini_hochberg(p_values):
+    '''
+    False discovery rate (Benjamini-Hochberg adjusted p-values). NaN are kept as NaN.
+    '''
+    p_values = np.asarray(p_values, dtype=float)
+    fdr = np.full(p_values.shape, np.nan)
+    valid = np.flatnonzero(~np.isnan(p_values))
+    if valid.size:
+        order = valid[np.argsort(p_values[valid])]
+        ranked = p_values[order] * valid.size / np.arange(1, valid.size + 1)
+        fdr[order] = np.minimum(1, np.minimum.accumulate(ranked[::-1])[::-1])
+    return fdr
+
+
+def group_statistics(matrix, group_labels, groups=None):
+    '''
+    Statistics of all features at once, features in rows of matrix, samples in columns.
+    Requires scipy for p-values.
+
+    Args:
+        matrix (np.ndarray): features x samples intensities
+        group_labels (list): group of each column
+        groups (list): groups to compare, in order; default to order of first appearance.
+            With two groups, fold_change is groups[1] over groups[0] and the test is Welch's t-test;
+            with more groups, one-way ANOVA is used.
+
+    Returns:
+        dict: column name to 1-D array, incl. mean of each group, fold_change, log2_fold_change, 
+            statistic_score, p_value and FDR
+    '''
+    from scipy import stats
+
+    group_labels = np.asarray(group_labels)
+    groups = list(groups or dict.fromkeys(group_labels))
+    matrix = np.asarray(matrix, dtype=float)
+    data = [matrix[:, group_labels == g] for g in groups]
+    result = {
+        'intensity_sample_mean': np.nanmean(matrix, axis=1),
+        'intensity_sample_std': np.nanstd(matrix, axis=1, ddof=1),
+    }
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result['intensity_sample_cv'] = result['intensity_sample_std'] / result['intensity_sample_mean']
+        for g, d in zip(groups, data):
+            result['mean_' + str(g)] = np.nanmean(d, axis=1)
+        if len(groups) == 2:
+            result['fold_change'] = result['mean_' + str(groups[1])] / result['mean_' + str(groups[0])]
+            result['log2_fold_change'] = np.log2(result['fold_change'])
+            statistic, p_value = stats.ttest_ind(data[1], data[0], axis=1, equal_var=False, nan_policy='omit')
+        elif len(groups) > 2:
+            statistic, p_value = stats.f_oneway(*data, axis=1)
+        else:
+            statistic = p_value = np.full(matrix.shape[0], np.nan)
+    result['statistic_score'] = np.asarray(statistic, dtype=float)
+    result['p_value'] = np.asarray(p_value, dtype=float)
+    result['FDR'] = benjamini_hochberg(result['p_value'])
+    return result
+
+
+def cluster_peaks(mz, rtime, mz_tolerance_ppm=5, rt_tolerance=2):
+    '''
+    Group peaks into features by sorting, in O(n log n).
+    Peaks are sorted by m/z and split where consecutive m/z differ more than mz_tolerance_ppm;
+    each m/z group is then sorted by retention time and split where consecutive rtime differ more than rt_tolerance.
+
+    Args:
+        mz (np.ndarray): m/z of peaks
+        rtime (np.ndarray): retention time of peaks
+        mz_tolerance_ppm (float): m/z tolerance in ppm between neighboring peaks
+        rt_tolerance (float): retention time tolerance, in unit of rtime, between neighboring peaks
+
+    Returns:
+        np.ndarray: cluster index of each peak, in input order, clusters numbered by m/z then rtime
+    '''
+    mz, rtime = np.asarray(mz, dtype=float), np.asarray(rtime, dtype=float)
+    if not mz.size:
+        return np.zeros(0, dtype=np.intp)
+    order = np.argsort(mz, kind='stable')
+    mz_group = np.concatenate([[0], np.cumsum(np.diff(mz[order]) > mz[order][1:] * mz_tolerance_ppm * 1e-6)])
+    # mz_group is nondecreasing, thus unchanged by this sort within groups
+    order = order[np.lexsort((rtime[order], mz_group))]
+    new_cluster = (np.diff(mz_group) > 0) | (np.diff(rtime[order]) > rt_tolerance)
+    clusters = np.empty(mz.size, dtype=np.intp)
+    clusters[order] = np.concatenate([[0], np.cumsum(new_cluster)])
+    return clusters
+
+
+def loess_smoother_matrix(x_fit, x_eval, frac=0.75):
+    '''
+    Linear operator of local linear regression (LOESS, tricube weights, no robustness iterations),
+    such that fitted values at x_eval are S @ y for any y observed at x_fit.
+    Since S does not depend on y, many series (e.g. all features) are smoothed by one matrix product.
+
+    Returns:
+        np.ndarray: S, of shape (len(x_eval), len(x_fit))
+    '''
+    x_fit, x_eval = np.asarray(x_fit, dtype=float), np.asarray(x_eval, dtype=float)
+    # at least 3 points in each local fit, as a line through 2 points only interpolates them
+    q = min(len(x_fit), max(3, int(np.ceil(frac * len(x_fit)))))
+    d = x_fit[None, :] - x_eval[:, None]
+    distances = np.sort(np.abs(d), axis=1)
+    # the bandwidth reaches the (q+1)-th neighbor, which has zero weight, 
+    # and is at least 1.2 times the distance to the q-th neighbor, so that all q neighbors have a real weight
+    h = distances[:, q - 1] * 1.2
+    if q < len(x_fit):
+        h = np.maximum(h, distances[:, q])
+    h = np.maximum(h, 1e-12)
+    w = np.clip(1 - (np.abs(d) / h[:, None]) ** 3, 0, None) ** 3
+    s0, s1, s2 = w.sum(axis=1), (w * d).sum(axis=1), (w * d ** 2).sum(axis=1)
+    denominator = s0 * s2 - s1 ** 2
+    local_linear = w * (s2[:, None] - s1[:, None] * d) / np.where(denominator > 1e-12, denominator, 1)[:, None]
+    local_mean = w / s0[:, None]
+    return np.where((denominator > 1e-12)[:, None], local_linear, local_mean)
+
+
+def correct_drift(matrix, injection_order, is_QC, batches, frac=0.75, min_QC=4):
+    '''
+    QC-based drift correction over injection order, in place in row chunks of matrix (a ChunkedMatrix).
+    injection_order, is_QC and batches are given per column of matrix.
+    min_QC must be at least 4, so that a local fit over 3 QC samples does not reduce to interpolation.
+    See Experiment.correct_drift.
+
+    Returns:
+        dict: number of QC samples per batch
+    '''
+    if min_QC < 4:
+        raise ValueError("min_QC must be at least 4, got %s." %min_QC)
+    injection_order, is_QC, batches = np.asarray(injection_order), np.asarray(is_QC), np.asarray(batches)
+    smoothers, number_QC = [], {}
+    for batch in dict.fromkeys(batches.tolist()):
+        columns = np.flatnonzero(batches == batch)
+        QC_columns = columns[is_QC[columns]]
+        number_QC[batch] = len(QC_columns)
+        if len(QC_columns) >= min_QC:
+            S = loess_smoother_matrix(injection_order[QC_columns], injection_order[columns], frac)
+            smoothers.append((columns, QC_columns, S.T))
+    if not smoothers:
+        return number_QC
+    for rows, block in matrix.iter_row_chunks():
+        block = np.array(block, dtype=float)
+        # common reference over all QC samples, which also aligns batches
+        reference = np.nanmedian(block[:, is_QC], axis=1)
+        for columns, QC_columns, S_T in smoothers:
+            QC = block[:, QC_columns]
+            QC = np.where(np.isnan(QC), np.nanmedian(QC, axis=1)[:, None], QC)
+            fitted = QC @ S_T
+            with np.errstate(divide='ignore', invalid='ignore'):
+                factors = np.where(fitted > 0, reference[:, None] / fitted, 1)
+            block[:, columns] *= np.nan_to_num(factors, nan=1)
+        matrix.write_rows(rows, block)
+    return number_QC
+
+
+def fit_rt_warping(observed, reference, method='linear', smoothing=None):
+    '''
+    Fit a retention time warping function from anchors, observed rtime to reference rtime.
+    Anchors are sorted by observed rtime and averaged if observed rtime is duplicated.
+    'linear' is piecewise-linear between anchors, made monotonic;
+    'spline' is a cubic smoothing spline (scipy.interpolate.UnivariateSpline). 
+    Outside the anchors, the shift of the nearest end anchor is applied.
+
+    Returns:
+        function: mapping an array of rtime to corrected rtime
+    '''
+    observed, inverse = np.unique(np.asarray(observed, dtype=float), return_inverse=True)
+    reference = np.bincount(inverse, np.asarray(reference, dtype=float)) / np.bincount(inverse)
+    if method == 'linear':
+        reference = np.maximum.accumulate(reference)
+        warp = lambda rt: np.interp(rt, observed, reference)
+    elif method == 'spline':
+        from scipy.interpolate import UnivariateSpline
+        warp = UnivariateSpline(observed, reference, k=min(3, len(observed) - 1), s=smoothing)
+    else:
+        raise ValueError("Unknown RT warping method %s, use 'linear' or 'spline'." %method)
+    low, high = observed[0], observed[-1]
+    shift_low, shift_high = reference[0] - low, reference[-1] - high
+
+    def model(rt):
+        rt = np.asarray(rt, dtype=float)
+        return np.where(rt < low, rt + shift_low, np.where(rt > high, rt + shift_high, warp(rt)))
+    return model
+
+
+PROTON = 1.00727646677
+
+# m/z differences to the anchor ion, M+H[1+] in pos mode and M-H[1-] in neg mode
+# see simpleTuples for the ion notation
+default_mz_deltas = {
+    'pos': [
+        (1.0034, 'M(13C)+H[1+]'),
+        (2.0067, 'M(13C2)+H[1+]'),
+        (21.9819, 'M+Na[1+]'),
+        (37.9559, 'M+K[1+]'),
+        (17.0265, 'M+NH4[1+]'),
+        (-18.0106, 'M-H2O+H[1+]'),
+    ],
+    'neg': [
+        (1.0034, 'M(13C)-H[1-]'),
+        (2.0067, 'M(13C2)-H[1-]'),
+        (21.9819, 'M+Na-2H[1-]'),
+        (35.9767, 'M+Cl[1-]'),
+        (46.0055, 'M+HCOO[1-]'),
+        (-18.0106, 'M-H2O-H[1-]'),
+    ],
+}
+
+
+def find_mz_delta_pairs(mz, rtime, mz_deltas, mz_tolerance_ppm=5, rt_tolerance=2):
+    '''
+    Find pairs of co-eluting features related by m/z differences, using sorted windows.
+    For each delta, all features are searched at once by binary search of mz + delta on sorted m/z.
+
+    Args:
+        mz (np.ndarray): m/z of features
+        rtime (np.ndarray): retention time of features
+        mz_deltas (list): m/z differences to search
+        mz_tolerance_ppm (float): m/z tolerance in ppm
+        rt_tolerance (float): maximal retention time difference
+
+    Returns:
+        tuple: arrays (anchor index, partner index, delta index), partner m/z = anchor m/z + delta
+    '''
+    mz, rtime = np.asarray(mz, dtype=float), np.asarray(rtime, dtype=float)
+    order = np.argsort(mz)
+    sorted_mz = mz[order]
+    anchors, partners, deltas = [], [], []
+    for kk, delta in enumerate(mz_deltas):
+        target = mz + delta
+        low = np.searchsorted(sorted_mz, target * (1 - mz_tolerance_ppm * 1e-6), side='left')
+        high = np.searchsorted(sorted_mz, target * (1 + mz_tolerance_ppm * 1e-6), side='right')
+        counts = high - low
+        anchor = np.repeat(np.arange(mz.size), counts)
+        # expand each window [low, high) into positions
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        partner = order[np.repeat(low, counts) + offsets]
+        valid = (anchor != partner) & (np.abs(rtime[anchor] - rtime[partner]) <= rt_tolerance)
+        anchors.append(anchor[valid])
+        partners.append(partner[valid])
+        deltas.append(np.full(valid.sum(), kk))
+    return np.concatenate(anchors), np.concatenate(partners), np.concatenate(deltas)
+
+
+def connected_groups(number_nodes, edges_a, edges_b):
+    '''
+    Connected components of a graph by union-find. Returns component label of each node.
+    '''
+    parent = np.arange(number_nodes)
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in zip(edges_a.tolist(), edges_b.tolist()):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+    return np.array([find(x) for x in range(number_nodes)], dtype=np.intp)
@@ -8,6 +8,7 @@ Dictionary formats are used in asari too.
 '''
 
 from collections import namedtuple
+import numpy as np
 
 massTrace = namedtuple('massTrace', ['id_number', 'mz', 'rt_scan_numbers', 'intensity', 'number_peaks'])
 
@@ -19,4 +20,80 @@ elutionPeak = namedtuple('elutionPeak', ['id_number', 'mz', 'apex', 'left_base',
 empCpd = namedtuple('empCpd', ['mz_anchors', 'ions', 'list_peaks'])
 
 # ions = ['M[1+]', 'M+H[1+]', '(13C)M+H[1+]', 'M+Na[1+]', 'M+H2O+H[1+]', ...]
-# mz_deltas = [-1.0073, 0, 1.0034, 21.9820, 18.0106]
\ No newline at end of file
+# mz_deltas = [-1.0073, 0, 1.0034, 21.9820, 18.0106]
+
+#
+# NumPy structured dtypes matching the namedtuples above, one record per peak or mass trace,
+# so that filters become array expressions, e.g. peaks[(peaks['height'] > 1e5) & (peaks['goodness_fitting'] > 0.9)].
+# IDs can be int or str, thus are object fields; variable-length lists in massTrace are object fields too.
+#
+
+massTrace_dtype = np.dtype([('id_number', 'O'), ('mz', 'f8'), ('rt_scan_numbers', 'O'), ('intensity', 'O'), 
+                            ('number_peaks', 'i4')])
+
+elutionPeak_dtype = np.dtype([('id_number', 'O'), ('mz', 'f8'), ('apex', 'i4'), ('left_base', 'i4'), ('right_base', 'i4'),
+                              ('height', 'f8'), ('parent_masstrace_id', 'O'), ('rtime', 'f8'), ('peak_area', 'f8'), 
+                              ('goodness_fitting', 'f8')])
+
+def tuples_to_array(list_tuples, dtype=elutionPeak_dtype):
+    '''
+    Convert a list of massTrace or elutionPeak namedtuples to a structured array of the matching dtype.
+    '''
+    return np.array(list_tuples, dtype=dtype)
+
+def array_to_tuples(array, tuple_type=elutionPeak):
+    '''
+    Convert a structured array to a list of namedtuples, e.g. tuple_type=massTrace.
+    '''
+    return [tuple_type._make(x) for x in array.tolist()]
+
+# core.Peak uses 'parent_masstrack_id'; other elutionPeak fields without a core.Peak field are set as attributes
+_peak_field_to_core = {'id_number': 'id', 'parent_masstrace_id': 'parent_masstrack_id'}
+
+def array_to_core_peaks(array):
+    '''
+    Convert an elutionPeak_dtype array to a list of core.Peak.
+    '''
+    from metDataModel.core import Peak
+    peaks = []
+    for record in array.tolist():
+        peak = Peak()
+        for name, value in zip(elutionPeak._fields, record):
+            setattr(peak, _peak_field_to_core.get(name, name), value)
+        peaks.append(peak)
+    return peaks
+
+def core_peaks_to_array(list_peaks):
+    '''
+    Convert a list of core.Peak to an elutionPeak_dtype array. Missing attributes are NaN, or 0 for integer fields.
+    '''
+    defaults = {'i': 0, 'f': np.nan, 'O': None}
+    attributes = [(_peak_field_to_core.get(name, name), defaults[elutionPeak_dtype[name].kind]) 
+                  for name in elutionPeak._fields]
+
+    def _get(peak, attribute, default):
+        value = getattr(peak, attribute, None)
+        return default if value is None else value
+
+    return np.array([tuple(_get(p, attribute, default) for attribute, default in attributes) for p in list_peaks], 
+                    dtype=elutionPeak_dtype)
+
+def array_to_core_masstracks(array):
+    '''
+    Convert a massTrace_dtype array to a list of core.MassTrack. 
+    rt_scan_numbers and intensity become list_retention_time and list_intensity; number_peaks is set as attribute.
+    '''
+    from metDataModel.core import MassTrack
+    tracks = []
+    for id_number, mz, rt_scan_numbers, intensity, number_peaks in array.tolist():
+        track = MassTrack(id=id_number, mz=mz, list_retention_time=list(rt_scan_numbers), list_intensity=list(intensity))
+        track.number_peaks = number_peaks
+        tracks.append(track)
+    return tracks
+
+def core_masstracks_to_array(list_masstracks):
+    '''
+    Convert a list of core.MassTrack to a massTrace_dtype array.
+    '''
+    return np.array([(t.id, t.mz, t.list_retention_time, t.list_intensity, getattr(t, 'number_peaks', 0)) 
+                     for t in list_masstracks], dtype=massTrace_dtype)
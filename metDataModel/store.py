@@ -0,0 +1,211 @@
+'''
+Local SQLite store for metDataModel objects, a single file for many experiments.
+
+Experiment, Sample, Feature, EmpiricalCompound and Peak are stored as rows of indexed columns
+plus the JSON of their serialize() output, from which objects are restored.
+Features are indexed on mz, rtime and experiment_belonged, for fast range queries across experiments.
+Inserts are bulk (executemany) in one transaction per call.
+
+Example:
+    store = SQLiteStore('results.db')
+    store.add_experiment(experiment)
+    store.add_features(list_features, experiment_id=experiment.id)
+    features = store.query_features(mz_range=(133.10, 133.11), rtime_range=(100, 140))
+'''
+
+import copy
+import json
+import sqlite3
+
+from metDataModel.core import metDataMember, Sample, JSON_BACKEND, _JSON_encoder
+
+_schema = '''
+CREATE TABLE IF NOT EXISTS experiments (
+    id TEXT PRIMARY KEY,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS samples (
+    id TEXT,
+    experiment TEXT,
+    name TEXT,
+    sample_type TEXT,
+    data TEXT,
+    PRIMARY KEY (experiment, id)
+);
+CREATE TABLE IF NOT EXISTS features (
+    id TEXT,
+    experiment_belonged TEXT,
+    mz REAL,
+    rtime REAL,
+    height REAL,
+    peak_area REAL,
+    snr REAL,
+    goodness_fitting REAL,
+    data TEXT,
+    PRIMARY KEY (experiment_belonged, id)
+);
+CREATE INDEX IF NOT EXISTS features_mz ON features (mz);
+CREATE INDEX IF NOT EXISTS features_rtime ON features (rtime);
+CREATE INDEX IF NOT EXISTS features_experiment ON features (experiment_belonged, mz);
+CREATE TABLE IF NOT EXISTS empCpds (
+    id TEXT,
+    experiment_belonged TEXT,
+    neutral_base_mass REAL,
+    data TEXT,
+    PRIMARY KEY (experiment_belonged, id)
+);
+CREATE INDEX IF NOT EXISTS empCpds_mass ON empCpds (neutral_base_mass);
+CREATE TABLE IF NOT EXISTS peaks (
+    id TEXT,
+    sample TEXT,
+    mz REAL,
+    rtime REAL,
+    data TEXT,
+    PRIMARY KEY (sample, id)
+);
+CREATE INDEX IF NOT EXISTS peaks_mz ON peaks (mz);
+'''
+
+# columns of FeatureTable returned by query_features(as_DataFrame=True)
+feature_columns = ['id', 'experiment_belonged', 'mz', 'rtime', 'height', 'peak_area', 'snr', 'goodness_fitting']
+
+
+class SQLiteStore:
+    '''
+    Indexed SQLite-backed persistence of Experiments, Samples, Features, EmpiricalCompounds and Peaks.
+    Rows are replaced if the same (experiment, id) is added again.
+    '''
+    def __init__(self, path=':memory:', backend=None):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(_schema)
+        self.encode = _JSON_encoder(backend or JSON_BACKEND)
+
+    def close(self):
+        self.connection.close()
+
+    def _insert(self, table, columns, rows):
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO %s (%s) VALUES (%s)' %(table, ', '.join(columns), ', '.join('?' * len(columns))),
+                rows)
+
+    def _select(self, table, conditions, parameters):
+        sql = 'SELECT data FROM %s' %table
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        return [metDataMember.deserialize(json.loads(x)) for (x,) in self.connection.execute(sql, parameters)]
+
+    @staticmethod
+    def _range_conditions(column, value_range, conditions, parameters):
+        if value_range is not None:
+            conditions.append('%s BETWEEN ? AND ?' %column)
+            parameters += list(value_range)
+
+    #
+    # Adding objects
+    #
+
+    def add_experiment(self, experiment):
+        '''
+        Store an Experiment, with its Samples (ordered_samples) and EmpiricalCompounds (List_of_empCpds).
+        The experiment row keeps sample and empCpd IDs only; feature_DataFrame is not stored, use add_features.
+        '''
+        shallow = copy.copy(experiment)
+        shallow.ordered_samples = [s.id if isinstance(s, Sample) else s for s in experiment.ordered_samples]
+        shallow.List_of_empCpds = [e.get('id') if isinstance(e, dict) else getattr(e, 'id', e)
+                                   for e in experiment.List_of_empCpds]
+        serialized = shallow.serialize()
+        for key in ('feature_DataFrame', 'feature_statistics'):
+            serialized.pop(key, None)
+        self._insert('experiments', ['id', 'data'], [(experiment.id, self.encode(serialized))])
+        self.add_samples([s for s in experiment.ordered_samples if isinstance(s, Sample)], experiment.id)
+        self.add_empCpds([e for e in experiment.List_of_empCpds if isinstance(e, metDataMember)], experiment.id)
+
+    def add_samples(self, list_samples, experiment_id=''):
+        rows = []
+        for sample in list_samples:
+            # the parent Experiment is stored by id, to avoid serializing it with every sample
+            shallow = copy.copy(sample)
+            if not isinstance(shallow.experiment, str):
+                shallow.experiment = getattr(shallow.experiment, 'id', '')
+            rows.append((sample.id, experiment_id or shallow.experiment, sample.name, sample.sample_type, 
+                         self.encode(shallow.serialize())))
+        self._insert('samples', ['id', 'experiment', 'name', 'sample_type', 'data'], rows)
+
+    def add_features(self, list_features, experiment_id=None):
+        '''
+        Store Features; experiment_id, if given, is used instead of Feature.experiment_belonged.
+        '''
+        self._insert('features', ['id', 'experiment_belonged'] + feature_columns[2:] + ['data'], (
+            (f.id, experiment_id or f.experiment_belonged, f.mz, f.rtime, f.height, f.peak_area, f.snr, 
+             f.goodness_fitting, self.encode(f.serialize())) for f in list_features))
+
+    def add_empCpds(self, list_empCpds, experiment_id=None):
+        self._insert('empCpds', ['id', 'experiment_belonged', 'neutral_base_mass', 'data'], (
+            (e.id, experiment_id or e.experiment_belonged, e.neutral_base_mass, self.encode(e.serialize())) 
+            for e in list_empCpds))
+
+    def add_peaks(self, list_peaks, sample_id=None):
+        self._insert('peaks', ['id', 'sample', 'mz', 'rtime', 'data'], (
+            (p.id, sample_id or p.sample, p.mz, p.rtime, self.encode(p.serialize())) for p in list_peaks))
+
+    #
+    # Queries
+    #
+
+    def get_experiment(self, experiment_id):
+        '''
+        Return the Experiment, with ordered_samples and List_of_empCpds as IDs; None if not found.
+        '''
+        result = self._select('experiments', ['id = ?'], [experiment_id])
+        return result[0] if result else None
+
+    def list_experiments(self):
+        return [x for (x,) in self.connection.execute('SELECT id FROM experiments')]
+
+    def get_samples(self, experiment_id, sample_type=None):
+        conditions, parameters = ['experiment = ?'], [experiment_id]
+        if sample_type is not None:
+            conditions.append('sample_type = ?')
+            parameters.append(sample_type)
+        return self._select('samples', conditions, parameters)
+
+    def query_features(self, mz_range=None, rtime_range=None, experiment_id=None, as_DataFrame=False):
+        '''
+        Features in m/z and retention time ranges (inclusive), optionally of one experiment.
+        Returns Feature objects, or a FeatureTable as pandas DataFrame of feature_columns if as_DataFrame.
+        '''
+        conditions, parameters = [], []
+        self._range_conditions('mz', mz_range, conditions, parameters)
+        # m/z ranges are far more selective; unary + keeps SQLite from using the rtime index then
+        self._range_conditions('+rtime' if mz_range else 'rtime', rtime_range, conditions, parameters)
+        if experiment_id is not None:
+            conditions.append('experiment_belonged = ?')
+            parameters.append(experiment_id)
+        if not as_DataFrame:
+            return self._select('features', conditions, parameters)
+        import pandas as pd
+        sql = 'SELECT %s FROM features' %', '.join(feature_columns)
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        return pd.DataFrame(self.connection.execute(sql, parameters).fetchall(), columns=feature_columns)
+
+    def query_empCpds(self, mass_range=None, experiment_id=None):
+        '''
+        EmpiricalCompounds by neutral_base_mass range (inclusive), optionally of one experiment.
+        '''
+        conditions, parameters = [], []
+        self._range_conditions('neutral_base_mass', mass_range, conditions, parameters)
+        if experiment_id is not None:
+            conditions.append('experiment_belonged = ?')
+            parameters.append(experiment_id)
+        return self._select('empCpds', conditions, parameters)
+
+    def query_peaks(self, mz_range=None, rtime_range=None, sample_id=None):
+        conditions, parameters = [], []
+        self._range_conditions('mz', mz_range, conditions, parameters)
+        self._range_conditions('rtime', rtime_range, conditions, parameters)
+        if sample_id is not None:
+            conditions.append('sample = ?')
+            parameters.append(sample_id)
+        return self._select('peaks', conditions, parameters)
@@ -0,0 +1,234 @@
+'''
+Synthetic but realistic data for scale testing and benchmarks, without patient data.
+
+Distributions:
+    neutral masses, 80 + gamma distribution, most between 150 and 500 Da, capped at 1200;
+    retention time, uniform over the chromatography;
+    intensity, log-normal per compound and sample, with small per-ion noise and mild drift over injection order;
+    isotopes and adducts, per empirical compound, using processing.default_mz_deltas, 
+        13C isotope ratio increasing with mass, as in real data.
+
+All output is deterministic from seed. Generation is in chunks, each chunk seeded by (seed, chunk number),
+so that the iter_ functions can stream datasets larger than RAM and any chunk can be regenerated alone.
+generate_experiment builds an in-memory Experiment from the same chunks, and returns its Features separately.
+
+Example:
+    experiment, features = generate_experiment(number_features=10000, number_samples=100, number_empCpds=2000, seed=1)
+    for features, empCpds, intensities in iter_feature_chunks(10**8, 2000, 10**7, chunk_size=100000):
+        ...     # write to disk
+'''
+
+import numpy as np
+
+from metDataModel.core import Experiment, Sample, Feature, EmpiricalCompound, MassTrack, Spectrum
+from metDataModel.processing import default_mz_deltas, PROTON
+
+# streams, so that e.g. samples and features do not share random numbers
+_SAMPLES, _FEATURES, _MASSTRACKS, _SPECTRA = range(4)
+
+# probability of each ion in default_mz_deltas being observed, in order
+_ion_probability = [0.8, 0.3, 0.3, 0.1, 0.1, 0.1]
+
+
+def _rng(seed, stream, chunk=0):
+    return np.random.default_rng([seed, stream, chunk])
+
+
+def generate_samples(number_samples, seed=0, QC_interval=10, number_blanks=3, batch_size=100):
+    '''
+    Samples in injection order: number_blanks blanks at the start of each batch, 
+    a QC every QC_interval injections, and study samples otherwise.
+    '''
+    samples = []
+    for ii in range(number_samples):
+        position = ii % batch_size
+        if position < number_blanks:
+            sample_type = 'blank'
+        elif (position - number_blanks) % QC_interval == 0:
+            sample_type = 'QC'
+        else:
+            sample_type = 'study_sample'
+        samples.append(Sample(id='S%05d' %(ii + 1), name='sample_%05d' %(ii + 1), sample_type=sample_type, 
+                              batch='batch_%d' %(ii // batch_size + 1), injection_order=ii))
+    return samples
+
+
+def _sample_effects(samples, seed):
+    '''
+    Per-sample intensity factor (dilution and drift) and sample type masks.
+    '''
+    rng = _rng(seed, _SAMPLES)
+    order = np.array([s.injection_order for s in samples], dtype=float)
+    factors = rng.lognormal(0, 0.15, len(samples)) * (1 + 0.002 * (order % 100))
+    types = np.array([s.sample_type for s in samples])
+    return factors, types == 'blank', types == 'QC'
+
+
+def iter_feature_chunks(number_features, number_samples, number_empCpds=None, chunk_size=100000, seed=0, 
+                        mode='pos', total_time=600, experiment_id='EXP_synthetic'):
+    '''
+    Stream features in chunks of chunk_size.
+    Each chunk has its own empirical compounds (number_empCpds split in proportion), 
+    whose ions fill the chunk first; remaining features are singletons.
+
+    Yields:
+        tuple: (list of Features, list of EmpiricalCompounds, intensity array of chunk features x samples)
+    '''
+    if number_empCpds is None:
+        number_empCpds = number_features // 4
+    mz_deltas = default_mz_deltas[mode]
+    charge_shift = PROTON if mode == 'pos' else -PROTON
+    samples = generate_samples(number_samples, seed)
+    sample_factors, is_blank, is_QC = _sample_effects(samples, seed)
+
+    for chunk, start in enumerate(range(0, number_features, chunk_size)):
+        rng = _rng(seed, _FEATURES, chunk)
+        size = min(chunk_size, number_features - start)
+        number_compounds = min(size, int(round(number_empCpds * size / number_features)))
+
+        # compounds: mass, rtime, ions observed
+        masses = np.minimum(80 + rng.gamma(2.5, 100, number_compounds), 1200)
+        rtimes = rng.uniform(0.02, 0.98, number_compounds) * total_time
+        observed = rng.random((number_compounds, len(mz_deltas))) < _ion_probability
+        ions_per_compound = 1 + observed.sum(axis=1)
+        # cut compounds to fit the chunk
+        last = np.searchsorted(np.cumsum(ions_per_compound), size, side='right')
+        masses, rtimes, observed = masses[:last], rtimes[:last], observed[:last]
+        ions_per_compound = ions_per_compound[:last]
+        number_compounds = last
+
+        # ions: compound index, delta index (-1 for anchor ion), relative abundance
+        compound_of_ion = np.repeat(np.arange(number_compounds), ions_per_compound)
+        delta_of_ion = np.full(compound_of_ion.size, -1)
+        ion_starts = np.cumsum(ions_per_compound) - ions_per_compound
+        for cc, jj in zip(*np.nonzero(observed)):
+            # fill positions after the anchor in order of deltas
+            ion_starts[cc] += 1
+            delta_of_ion[ion_starts[cc]] = jj
+        deltas = np.array([d for d, _ in mz_deltas] + [0.0])
+        ratios = np.where(delta_of_ion == 0, 0.011 * masses[compound_of_ion] / 14,
+                          np.where(delta_of_ion == 1, (0.011 * masses[compound_of_ion] / 14) ** 2 / 2,
+                                   rng.uniform(0.05, 0.5, compound_of_ion.size)))
+        ratios[delta_of_ion == -1] = 1
+
+        number_singletons = size - compound_of_ion.size
+        mz = np.concatenate([masses[compound_of_ion] + charge_shift + deltas[delta_of_ion] * (delta_of_ion >= 0),
+                             np.minimum(80 + rng.gamma(2.5, 100, number_singletons), 1200)])
+        mz = mz * (1 + rng.normal(0, 1e-6, size))
+        rtime = np.concatenate([rtimes[compound_of_ion] + rng.normal(0, 0.5, compound_of_ion.size),
+                                rng.uniform(0.02, 0.98, number_singletons) * total_time])
+
+        # intensities: compound abundance x ion ratio x sample factor x noise
+        abundance = rng.lognormal(11, 1.5, number_compounds + number_singletons)
+        abundance = np.concatenate([abundance[compound_of_ion] * ratios, abundance[number_compounds:]])
+        biological = rng.lognormal(0, 0.5, (size, number_samples))
+        biological[:, is_QC] = 1
+        intensities = abundance[:, None] * biological * sample_factors[None, :] * rng.lognormal(0, 0.08, (size, number_samples))
+        intensities[:, is_blank] *= 0.01
+        intensities[intensities < 2000] = 0
+        intensities = intensities.astype(np.float32)
+
+        ids = ['F%d' %(start + ii + 1) for ii in range(size)]
+        goodness_fitting = rng.beta(8, 2, size)
+        height = intensities.max(axis=1)
+        features = [Feature(id=ids[ii], mz=float(mz[ii]), rtime=float(rtime[ii]), height=float(height[ii]), 
+                            peak_area=float(height[ii] * 6), goodness_fitting=float(goodness_fitting[ii]), 
+                            snr=float(height[ii] / 2000), experiment_belonged=experiment_id) 
+                    for ii in range(size)]
+
+        empCpds = []
+        ion_names = [name for _, name in mz_deltas]
+        anchor_ion = 'M+H[1+]' if mode == 'pos' else 'M-H[1-]'
+        bounds = np.concatenate([[0], np.cumsum(ions_per_compound)])
+        for cc in range(number_compounds):
+            members = range(bounds[cc], bounds[cc + 1])
+            empCpds.append(EmpiricalCompound(
+                id='E%d_%d' %(chunk, cc + 1),
+                experiment_belonged=experiment_id,
+                neutral_base_mass=float(masses[cc]),
+                MS1_pseudo_Spectra=[{'id': ids[ii], 'mz': float(mz[ii]), 'rtime': float(rtime[ii]),
+                                     'ion_relation': anchor_ion if delta_of_ion[ii] < 0 else ion_names[delta_of_ion[ii]]}
+                                    for ii in members],
+                list_features=[ids[ii] for ii in members],
+            ))
+        yield features, empCpds, intensities
+
+
+def iter_masstracks(number_tracks, number_scans=1000, seed=0, total_time=600, chunk_size=10000):
+    '''
+    Stream MassTracks, each with one or a few Gaussian elution peaks on a log-normal noise baseline.
+    '''
+    scan_times = np.linspace(0, total_time, number_scans)
+    for chunk, start in enumerate(range(0, number_tracks, chunk_size)):
+        rng = _rng(seed, _MASSTRACKS, chunk)
+        size = min(chunk_size, number_tracks - start)
+        mz = np.minimum(80 + rng.gamma(2.5, 100, size), 1200)
+        signal = rng.lognormal(6, 0.5, (size, number_scans))
+        for _ in range(3):
+            present = rng.random(size) < 0.6
+            apex = rng.uniform(0, total_time, size)
+            width = rng.uniform(1, 5, size)
+            height = rng.lognormal(11, 1.5, size) * present
+            signal += height[:, None] * np.exp(-0.5 * ((scan_times[None, :] - apex[:, None]) / width[:, None]) ** 2)
+        for ii in range(size):
+            yield MassTrack(id='T%d' %(start + ii + 1), mz=float(mz[ii]), 
+                            list_retention_time=scan_times.tolist(), list_intensity=signal[ii].tolist())
+
+
+def iter_spectra(number_spectra, seed=0, mode='pos', chunk_size=10000):
+    '''
+    Stream MS2 Spectra, with 5 to 50 fragments below the precursor, intensity scaled to base peak 100.
+    '''
+    for chunk, start in enumerate(range(0, number_spectra, chunk_size)):
+        rng = _rng(seed, _SPECTRA, chunk)
+        size = min(chunk_size, number_spectra - start)
+        precursors = np.minimum(80 + rng.gamma(2.5, 100, size), 1200)
+        number_peaks = rng.integers(5, 51, size)
+        for ii in range(size):
+            list_mz = np.sort(rng.uniform(50, precursors[ii], number_peaks[ii]))
+            intensity = rng.lognormal(0, 1.2, number_peaks[ii])
+            yield Spectrum(id='MS2_%d' %(start + ii + 1), ms_level=2, ionization=mode, 
+                           precursor_ion_mz=float(precursors[ii]), rtime=float(rng.uniform(0, 600)),
+                           list_mz=list_mz.round(4).tolist(), list_intensity=(100 * intensity / intensity.max()).round(2).tolist())
+
+
+def generate_experiment(number_features=10000, number_samples=100, number_empCpds=None, number_masstracks=0,
+                        number_spectra=0, seed=0, mode='pos', chunk_size=100000):
+    '''
+    Generate an in-memory Experiment: samples (QC, blank, study_sample, in batches), 
+    feature_DataFrame (columns id_number, mz, rtime, then samples),
+    EmpiricalCompounds as List_of_empCpds, number_masstracks MassTracks per sample
+    and number_spectra MS2 Spectra attached to empCpds in turn.
+    Features are returned separately, as Experiment has no field for them (as in build_features_from_peaks), 
+    so that they are not serialized or stored with the experiment.
+    pandas is imported on first call, via metDataModel.dataframe.
+
+    Returns:
+        tuple: (Experiment, list of Features in rows of feature_DataFrame)
+    '''
+    from metDataModel import dataframe
+
+    experiment = Experiment(id='EXP_synthetic_%d' %seed, number_samples=number_samples)
+    experiment.ordered_samples = generate_samples(number_samples, seed)
+    experiment.instrumentation['ionization'] = mode
+    features, empCpds, blocks = [], [], []
+    for chunk_features, chunk_empCpds, intensities in iter_feature_chunks(
+            number_features, number_samples, number_empCpds, chunk_size, seed, mode, experiment_id=experiment.id):
+        features += chunk_features
+        empCpds += chunk_empCpds
+        blocks.append(intensities)
+    df = dataframe.from_matrix(np.concatenate(blocks) if blocks else np.zeros((0, number_samples), dtype=np.float32), 
+                               columns=[s.name for s in experiment.ordered_samples])
+    df.insert(0, 'rtime', [f.rtime for f in features])
+    df.insert(0, 'mz', [f.mz for f in features])
+    df.insert(0, 'id_number', [f.id for f in features])
+    experiment.feature_DataFrame = df
+    experiment.List_of_empCpds = empCpds
+
+    if number_masstracks:
+        for ii, sample in enumerate(experiment.ordered_samples):
+            sample.list_MassTracks = list(iter_masstracks(number_masstracks, seed=seed * 100003 + ii))
+    if number_spectra and empCpds:
+        for ii, spectrum in enumerate(iter_spectra(number_spectra, seed, mode)):
+            empCpds[ii % len(empCpds)].MS2_Spectra.append(spectrum)
+    return experiment, features
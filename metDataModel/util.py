@@ -2,9 +2,17 @@
 Place holder for now -
 '''
 
+import os
+import re
 import json
+import multiprocessing as mp
 import yaml
 
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
+
 def covert_json_to_yaml(jfile, yfile):
     '''
     Convert JSON file jfile to YAML file yfile.
@@ -14,6 +22,150 @@ def covert_json_to_yaml(jfile, yfile):
     with open(yfile, 'w') as O:
         yaml.dump(jj, O)
 
+#
+# Streaming conversion, for JSON files too large to load at once
+#
+
+_JSON_NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?')
+_JSON_LITERALS = {'true': True, 'false': False, 'null': None}
+_STR_TAG = 'tag:yaml.org,2002:str'
+
+def _invalid_JSON(message, position):
+    return ValueError("Invalid JSON at position %d: %s." %(position, message))
+
+def iter_json_tokens(fp, buffer_size=1 << 20):
+    '''
+    Incrementally tokenize JSON from a text file handle, reading buffer_size characters at a time.
+    Yields (kind, value) tuples, kind being one of '{', '}', '[', ']', 'key', 'str', 'scalar'.
+    Separators (':' and ',') are checked and consumed but not yielded.
+    Malformed JSON raises ValueError with the character position.
+    '''
+    buf, pos, offset, eof = '', 0, 0, False
+    in_object = []                      # stack of container types, True for {} 
+    # what comes next: 'value', 'key', 'colon', 'separator' (',' or closing bracket), 
+    # or 'end' after the top-level value
+    expect = 'value'
+    opened = False                      # right after '{' or '[', which may close at once
+    while True:
+        while pos < len(buf) and buf[pos] in ' \t\r\n':
+            pos += 1
+        # only the tail of the buffer may hold an incomplete token
+        if not eof and len(buf) - pos < 64:
+            chunk = fp.read(buffer_size)
+            buf, pos, offset, eof = buf[pos:] + chunk, 0, offset + pos, not chunk
+            continue
+        if pos >= len(buf):
+            if expect != 'end':
+                raise _invalid_JSON("unexpected end", offset + pos)
+            return
+        c = buf[pos]
+        if expect == 'end':
+            raise _invalid_JSON("extra data %r" %buf[pos: pos+20], offset + pos)
+        if c in '}]':
+            if not (in_object and in_object[-1] == (c == '}')) or not (expect == 'separator' or opened):
+                raise _invalid_JSON("unexpected %r" %c, offset + pos)
+            in_object.pop()
+            expect = 'separator' if in_object else 'end'
+            opened = False
+            pos += 1
+            yield c, None
+            continue
+        if c == ',' or c == ':':
+            if expect != ('separator' if c == ',' else 'colon'):
+                raise _invalid_JSON("unexpected %r" %c, offset + pos)
+            expect = 'key' if c == ',' and in_object[-1] else 'value'
+            opened = False
+            pos += 1
+            continue
+        if expect == 'separator' or expect == 'colon':
+            raise _invalid_JSON("expected %s" %("':'" if expect == 'colon' else "',' or closing bracket"), offset + pos)
+        if expect == 'key' and c != '"':
+            raise _invalid_JSON("expected a key", offset + pos)
+        opened = False
+        if c in '{[':
+            in_object.append(c == '{')
+            expect = 'key' if c == '{' else 'value'
+            opened = True
+            pos += 1
+            yield c, None
+        elif c == '"':
+            try:
+                value, end = json.decoder.scanstring(buf, pos + 1)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise _invalid_JSON("invalid string", offset + e.pos)
+                chunk = fp.read(buffer_size)
+                buf, pos, offset, eof = buf[pos:] + chunk, 0, offset + pos, not chunk
+                continue
+            pos = end
+            if expect == 'key':
+                expect = 'colon'
+                yield 'key', value
+            else:
+                expect = 'separator' if in_object else 'end'
+                yield 'str', value
+        else:
+            m = _JSON_NUMBER.match(buf, pos)
+            if m and (m.end() < len(buf) or eof):
+                text = m.group()
+                value = int(text) if text.lstrip('-').isdigit() else float(text)
+                pos = m.end()
+            else:
+                for text, value in _JSON_LITERALS.items():
+                    if buf.startswith(text, pos):
+                        pos += len(text)
+                        break
+                else:
+                    raise _invalid_JSON("unexpected %r" %buf[pos: pos+20], offset + pos)
+            expect = 'separator' if in_object else 'end'
+            yield 'scalar', value
+
+def iter_yaml_events(tokens):
+    '''
+    Convert JSON tokens from iter_json_tokens to YAML events, in block style.
+    Key order is kept as in JSON (not sorted as in yaml.dump).
+    '''
+    resolver = SafeDumper(None)         # only used to resolve implicit tags
+    representer = yaml.representer.SafeRepresenter()
+    yield yaml.StreamStartEvent()
+    yield yaml.DocumentStartEvent(explicit=False)
+    for kind, value in tokens:
+        if kind == '{':
+            yield yaml.MappingStartEvent(anchor=None, tag=None, implicit=True, flow_style=False)
+        elif kind == '}':
+            yield yaml.MappingEndEvent()
+        elif kind == '[':
+            yield yaml.SequenceStartEvent(anchor=None, tag=None, implicit=True, flow_style=False)
+        elif kind == ']':
+            yield yaml.SequenceEndEvent()
+        else:
+            node = representer.represent_data(value)
+            # quote str that would otherwise be read back as other types, e.g. 'true' or '1.0'
+            plain = resolver.resolve(yaml.ScalarNode, node.value, (True, False)) == node.tag
+            yield yaml.ScalarEvent(anchor=None, tag=node.tag, implicit=(plain, node.tag == _STR_TAG), value=node.value)
+    yield yaml.DocumentEndEvent(explicit=False)
+    yield yaml.StreamEndEvent()
+
+def stream_json_to_yaml(jfile, yfile):
+    '''
+    Convert JSON file jfile to YAML file yfile without loading the whole JSON into memory.
+    The libyaml C emitter is used when available.
+    '''
+    with open(jfile, encoding='utf-8') as J, open(yfile, 'w', encoding='utf-8') as O:
+        yaml.emit(iter_yaml_events(iter_json_tokens(J)), O, Dumper=SafeDumper, allow_unicode=True)
+    return yfile
+
+def convert_json_dir_to_yaml(jdir, ydir, processes=None):
+    '''
+    Convert all .json files in directory jdir to .yaml files in directory ydir, 
+    one file per worker process. Returns list of YAML files written.
+    '''
+    os.makedirs(ydir, exist_ok=True)
+    jobs = [(os.path.join(jdir, f), os.path.join(ydir, os.path.splitext(f)[0] + '.yaml')) 
+            for f in sorted(os.listdir(jdir)) if f.endswith('.json')]
+    with mp.Pool(processes) as pool:
+        return pool.starmap(stream_json_to_yaml, jobs)
+
 class Compound_Methods:
     '''To calcuate MS-related properties here for each Compound
     '''
@@ -0,0 +1,343 @@
+'''
+Schema validation of metDataModel.core objects, using the field annotations in core.
+
+Annotations are compiled once per class into type checks, e.g.
+    'float'                 -> int or float (incl. numpy numbers), not bool
+    'list[str, Peak]'       -> list or tuple, elements str or Peak
+    'Union[str, Experiment]'-> str or Experiment
+    'dict[serializable_primitive_type, serializable_type]' -> dict with serializable values
+None is accepted where the field default is None, and as a value in dicts (e.g. Feature.statistics).
+
+validate_batch checks a collection column-wise: for each field, the distinct types of all values
+are checked once, and only values of failing types are located, so that 1M features take one pass per field.
+validate_feature_table checks a feature table (e.g. Experiment.feature_DataFrame) by columns.
+All errors are reported at once, as dicts of index, id, field and error.
+
+Example:
+    errors = validate_batch(list_features)
+    validate_batch(list_features, raise_errors=True)    # ValidationError listing all errors
+'''
+
+import re
+import numbers
+import inspect
+import dataclasses
+from itertools import chain
+
+import numpy as np
+
+from metDataModel import core
+
+class _Missing:
+    '''Value of a field absent from an object.'''
+
+_MISSING = _Missing()
+
+# where annotations in core do not describe the values in use
+annotation_overrides = {
+    ('Sample', 'list_MassTracks'): 'list[str, MassTrack]',
+    ('Sample', 'list_retention_time'): 'Union[list[str, float], dict]',
+    ('EmpiricalCompound', 'MS1_pseudo_Spectra'): 'list[str, dict, Peak]',
+}
+
+_aliases = {
+    'serializable_primitive_type': 'Union[str, float, int, tuple]',
+    'serializable_type': 'Union[str, float, int, tuple, dict, list, None]',
+}
+
+
+class ValidationError(ValueError):
+    '''
+    Raised with all errors found, which are kept in .errors.
+    '''
+    def __init__(self, errors, max_shown=20):
+        self.errors = errors
+        lines = ['%s %s.%s: %s' %(e['index'], e['id'], e['field'], e['error']) for e in errors[:max_shown]]
+        if len(errors) > max_shown:
+            lines.append('... %d more' %(len(errors) - max_shown))
+        super().__init__('%d validation errors\n%s' %(len(errors), '\n'.join(lines)))
+
+
+#
+# Compiling annotations.
+# A compiled annotation is a list of alternatives (type_predicate, element_predicate or None).
+# A value passes if its type passes one alternative, and if that alternative has an element_predicate,
+# the types of all its elements (values for dicts) pass it.
+#
+
+def _is_real(t):
+    return issubclass(t, (numbers.Real, np.integer, np.floating)) and t is not bool
+
+def _is_integer(t):
+    return issubclass(t, (numbers.Integral, np.integer)) and t is not bool
+
+_scalars = {
+    'str': lambda t: issubclass(t, str),
+    'float': _is_real,
+    'int': _is_integer,
+    'bool': lambda t: issubclass(t, (bool, np.bool_)),
+    'tuple': lambda t: issubclass(t, tuple),
+    'dict': lambda t: issubclass(t, dict),
+    'list': lambda t: issubclass(t, (list, tuple)),
+    'None': lambda t: t is type(None),
+    'pd.DataFrame': lambda t: t.__name__ == 'DataFrame',
+}
+
+def _split_arguments(text):
+    '''Split 'a, b[c, d], e' at top-level commas.'''
+    arguments, depth, start = [], 0, 0
+    for ii, char in enumerate(text):
+        if char == '[':
+            depth += 1
+        elif char == ']':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            arguments.append(text[start: ii].strip())
+            start = ii + 1
+    arguments.append(text[start:].strip())
+    return [x for x in arguments if x]
+
+def _any_type(alternatives):
+    predicates = [predicate for predicate, _ in alternatives]
+    return lambda t: any(p(t) for p in predicates)
+
+def compile_annotation(annotation, registry=None) -> list:
+    '''
+    Compile an annotation string, as in core dataclass fields, to a list of (type_predicate, element_predicate).
+    Unknown names accept any type.
+    '''
+    registry = registry or core.metDataMember._subclass_registry()
+    annotation = _aliases.get(annotation.strip(), annotation.strip())
+    match = re.fullmatch(r'([\w.]+)\[(.*)\]', annotation)
+    head, arguments = (match.group(1), _split_arguments(match.group(2))) if match else (annotation, [])
+    if head == 'Union':
+        return [alternative for x in arguments for alternative in compile_annotation(x, registry)]
+    if head in ('list', 'tuple') and arguments:
+        elements = [alternative for x in arguments for alternative in compile_annotation(x, registry)]
+        return [(_scalars['list'], _any_type(elements))]
+    if head == 'dict' and len(arguments) == 2:
+        values = compile_annotation(arguments[1], registry) + [(_scalars['None'], None)]
+        return [(_scalars['dict'], _any_type(values))]
+    if head in ('dict', 'list'):
+        return [(_scalars[head], None)]
+    if head in _scalars:
+        return [(_scalars[head], None)]
+    if head in registry:
+        cls = registry[head]
+        return [(lambda t: issubclass(t, cls), None)]
+    return [(lambda t: True, None)]
+
+
+def _elements(value):
+    return value.values() if isinstance(value, dict) else value
+
+
+class _FieldCheck:
+    def __init__(self, name, annotation, alternatives, nullable, lazy):
+        self.name = name
+        self.annotation = annotation
+        self.alternatives = alternatives
+        self.nullable = nullable
+        self.lazy = lazy            # descriptor field, e.g. Sample.list_peaks, which can be absent
+        self._verdicts = {}         # type -> alternative index, or -1 if no alternative
+
+    def verdict(self, t):
+        if t not in self._verdicts:
+            self._verdicts[t] = -1
+            if t is type(None) and self.nullable:
+                self._verdicts[t] = len(self.alternatives)
+            else:
+                for ii, (predicate, _) in enumerate(self.alternatives):
+                    if predicate(t):
+                        self._verdicts[t] = ii
+                        break
+        return self._verdicts[t]
+
+    def element_predicate(self, verdict):
+        return self.alternatives[verdict][1] if verdict < len(self.alternatives) else None
+
+    def check_value(self, value) -> str:
+        '''Error message for one value, or None.'''
+        if value is _MISSING:
+            return None if self.lazy else 'missing'
+        verdict = self.verdict(type(value))
+        if verdict < 0:
+            return 'expected %s, got %s' %(self.annotation, type(value).__name__)
+        predicate = self.element_predicate(verdict)
+        if predicate:
+            for x in _elements(value):
+                if not predicate(type(x)):
+                    return 'expected %s, got element %s' %(self.annotation, type(x).__name__)
+        return None
+
+    def check_column(self, values) -> list:
+        '''(position, error message) of failing values, checking each distinct type once.'''
+        types = set(map(type, values))
+        bad = _Missing in types and not self.lazy
+        element_checks = {}
+        for t in types:
+            if t is _Missing:
+                continue
+            verdict = self.verdict(t)
+            if verdict < 0:
+                bad = True
+            elif self.element_predicate(verdict):
+                element_checks[t] = self.element_predicate(verdict)
+        for t, predicate in element_checks.items():
+            element_types = set(map(type, chain.from_iterable(_elements(v) for v in values if type(v) is t)))
+            if not all(predicate(x) for x in element_types):
+                bad = True
+        if not bad:
+            return []
+        errors = []
+        for ii, value in enumerate(values):
+            message = self.check_value(value)
+            if message:
+                errors.append((ii, message))
+        return errors
+
+
+class Validator:
+    '''
+    Field checks of one metDataMember class, compiled from its annotations.
+    Use get_validator(cls) to reuse compiled validators.
+    '''
+    def __init__(self, cls):
+        self.cls = cls
+        registry = core.metDataMember._subclass_registry()
+        self.fields = []
+        for f in dataclasses.fields(cls):
+            annotation = annotation_overrides.get((cls.__name__, f.name), str(f.type))
+            for base in cls.__mro__:
+                annotation = annotation_overrides.get((base.__name__, f.name), annotation)
+            static = inspect.getattr_static(cls, f.name, None)
+            lazy = hasattr(type(static), '__get__') and hasattr(type(static), '__set__')
+            self.fields.append(_FieldCheck(f.name, annotation, compile_annotation(annotation, registry),
+                                           f.default is None or lazy, lazy))
+
+    def validate(self, obj, index=None) -> list:
+        values = vars(obj)
+        errors = []
+        for check in self.fields:
+            message = check.check_value(values.get(check.name, _MISSING))
+            if message:
+                errors.append({'index': index, 'id': values.get('id'), 'field': check.name, 'error': message})
+        return errors
+
+    def validate_batch(self, objects, indices=None) -> list:
+        dicts = [vars(obj) for obj in objects]
+        indices = range(len(dicts)) if indices is None else indices
+        errors = []
+        for check in self.fields:
+            column = [d.get(check.name, _MISSING) for d in dicts]
+            for position, message in check.check_column(column):
+                errors.append({'index': indices[position], 'id': dicts[position].get('id'),
+                               'field': check.name, 'error': message})
+        errors.sort(key=lambda e: e['index'])
+        return errors
+
+
+_validators = {}
+
+def get_validator(cls) -> Validator:
+    if cls not in _validators:
+        _validators[cls] = Validator(cls)
+    return _validators[cls]
+
+
+def validate(obj, raise_errors=False) -> list:
+    '''
+    Validate one metDataMember object against the annotations of its class.
+
+    Returns:
+        list: errors as dicts of index (None), id, field and error
+    '''
+    errors = get_validator(type(obj)).validate(obj)
+    if errors and raise_errors:
+        raise ValidationError(errors)
+    return errors
+
+def validate_batch(objects, raise_errors=False) -> list:
+    '''
+    Validate a collection of metDataMember objects column-wise, per class.
+    Objects can be of mixed classes; errors are in order of index in objects.
+
+    Args:
+        objects (list): metDataMember objects
+        raise_errors (bool): raise ValidationError with all errors, instead of returning them
+
+    Returns:
+        list: errors as dicts of index, id, field and error
+    '''
+    groups = {}
+    for ii, obj in enumerate(objects):
+        group = groups.setdefault(type(obj), ([], []))
+        group[0].append(obj)
+        group[1].append(ii)
+    errors = []
+    for cls, (members, indices) in groups.items():
+        if not issubclass(cls, core.metDataMember):
+            errors += [{'index': ii, 'id': None, 'field': None, 'error': 'not a metDataMember, got %s' %cls.__name__}
+                       for ii in indices]
+            continue
+        errors += get_validator(cls).validate_batch(members, indices)
+    errors.sort(key=lambda e: e['index'])
+    if errors and raise_errors:
+        raise ValidationError(errors)
+    return errors
+
+
+def validate_feature_table(table, id_column='id_number', mz_column='mz', rtime_column='rtime',
+                           sample_columns=None, raise_errors=False) -> list:
+    '''
+    Validate a feature table, e.g. Experiment.feature_DataFrame, by columns:
+    feature IDs present and unique, m/z positive and finite, retention time non-negative and finite,
+    sample intensities numeric and non-negative (NaN allowed for missing values).
+    Errors on rows give the row position as index, and the feature ID.
+
+    Args:
+        table (pd.DataFrame): features in rows
+        id_column, mz_column, rtime_column (str): column names; id_column can be absent, then index is used
+        sample_columns (list): intensity columns, default to all other columns
+
+    Returns:
+        list: errors as dicts of index, id, field and error
+    '''
+    errors = []
+    if id_column in table.columns:
+        ids = table[id_column].to_numpy()
+    else:
+        ids = table.index.to_numpy()
+    def add(field, positions, message):
+        for ii in positions.tolist():
+            errors.append({'index': ii, 'id': ids[ii], 'field': field, 'error': message})
+
+    null_ids = np.flatnonzero(np.array([x is None or x != x for x in ids], dtype=bool))
+    add(id_column, null_ids, 'missing feature ID')
+    _, first, counts = np.unique(ids.astype(str), return_index=True, return_counts=True)
+    duplicated = np.setdiff1d(np.flatnonzero(np.isin(ids.astype(str), ids.astype(str)[first[counts > 1]])), null_ids)
+    add(id_column, duplicated, 'duplicated feature ID')
+
+    for column, minimum in ((mz_column, 'positive'), (rtime_column, 'non-negative')):
+        if column not in table.columns:
+            errors.append({'index': None, 'id': None, 'field': column, 'error': 'missing column'})
+            continue
+        values = table[column].to_numpy()
+        if values.dtype.kind not in 'iuf':
+            errors.append({'index': None, 'id': None, 'field': column, 'error': 'not numeric, dtype %s' %values.dtype})
+            continue
+        add(column, np.flatnonzero(~np.isfinite(values)), 'not finite')
+        add(column, np.flatnonzero(values <= 0 if minimum == 'positive' else values < 0), 'not %s' %minimum)
+
+    if sample_columns is None:
+        sample_columns = [c for c in table.columns if c not in (id_column, mz_column, rtime_column)]
+    for column in sample_columns:
+        values = table[column].to_numpy()
+        if values.dtype.kind not in 'iuf':
+            errors.append({'index': None, 'id': None, 'field': column, 'error': 'not numeric, dtype %s' %values.dtype})
+            continue
+        add(column, np.flatnonzero(values < 0), 'negative intensity')
+
+    if errors and raise_errors:
+        raise ValidationError(errors)
+    return errors
@@ -6,7 +6,10 @@ with open("metDataModel/__init__.py") as f:
 with open("README.md", "r", encoding="utf-8") as fh:
     long_description = fh.read()
 
-requirements = [ ]
+requirements = ['numpy']
+
+# optional: PyYAML for to_YAML and from_YAML, pandas for Experiment.feature_DataFrame and processing tables
+extras_requirements = {'yaml': ['pyyaml'], 'dataframe': ['pandas'], 'all': ['pyyaml', 'pandas']}
 
 setup_requirements = [ ]
 
@@ -31,6 +34,7 @@ setup(
     ],
     description="Data models for metabolomics",
     install_requires=requirements,
+    extras_require=extras_requirements,
     license="BSD license",
     long_description=long_description,
     long_description_content_type="text/markdown",
@@ -0,0 +1,17 @@
+from metDataModel.container import ObjectContainer
+from metDataModel.core import Feature
+
+
+def test_ids_after_reopening(tmp_path):
+    path = str(tmp_path / 'features.mdmc')
+    with ObjectContainer(path, 'w', block_size=2) as C:
+        C.append([Feature(id=5, mz=100.0), Feature(id='F6', mz=200.0), Feature(id=7, mz=150.0)])
+        assert C.get(5).mz == 100.0
+    with ObjectContainer(path, 'a') as C:
+        C.append([Feature(id=8, mz=120.0)])
+    with ObjectContainer(path) as C:
+        assert 5 in C and '5' in C and 9 not in C
+        assert C.get(5).id == 5
+        assert [f.mz for f in C.get_many([7, 'F6', 8])] == [150.0, 200.0, 120.0]
+        assert sorted(C.ids()) == ['5', '7', '8', 'F6']
+        assert [f.id for f in C.query_mz(110, 160)] == [8, 7]
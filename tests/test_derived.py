@@ -0,0 +1,24 @@
+from metDataModel.core import Compound, Spectrum
+from metDataModel.derived import Compound_spectra, merge_Compound_spectra
+
+
+def test_content_hash_requires_structure():
+    assert Compound(neutral_formula='C6H12O6').content_hash() is None
+    assert Compound(neutral_formula=None, inchi=None, SMILES=None).content_hash() is None
+    glucose = Compound(neutral_formula='C6H12O6', SMILES='OC[C@H]1OC(O)[C@H](O)[C@@H](O)[C@@H]1O')
+    assert glucose.content_hash() == Compound(neutral_formula='C6H12O6 ', SMILES=glucose.SMILES).content_hash()
+    assert Compound(inchi='InChI=1S/H2O/h1H2', neutral_formula=None).content_hash() is not None
+
+
+def test_merge_keeps_isomers_apart():
+    spectrum = Spectrum(list_mz=[181.07], list_intensity=[100.0])
+    glucose = Compound_spectra(id='HMDB0000122', neutral_formula='C6H12O6', SMILES='C(C1C(C(C(C(O1)O)O)O)O)O',
+                               db_ids=['HMDB0000122'], MS1_ESI_pos=[spectrum])
+    duplicate = Compound_spectra(id='MoNA1', neutral_formula='C6H12O6', SMILES='C(C1C(C(C(C(O1)O)O)O)O)O',
+                                 db_ids=['MoNA1'], MS1_ESI_pos=[Spectrum(list_mz=[181.07], list_intensity=[50.0])])
+    fructose = Compound_spectra(id='HMDB0000660', neutral_formula='C6H12O6')
+    galactose = Compound_spectra(id='HMDB0000143', neutral_formula='C6H12O6')
+    result = merge_Compound_spectra([glucose, duplicate, fructose, galactose])
+    assert result == [glucose, fructose, galactose]
+    assert glucose.db_ids == ['HMDB0000122', 'MoNA1']
+    assert len(glucose.MS1_ESI_pos) == 1
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from metDataModel.core import Experiment, Sample, EmpiricalCompound
+
+
+def _experiment(sample_types):
+    '''
+    Features F0 (good), F1 (in blanks), F2 (variable in QC), F3 (rarely detected).
+    '''
+    samples = [Sample(id='S%d' %ii, name='sample_%d' %ii, sample_type=t) for ii, t in enumerate(sample_types)]
+    rng = np.random.default_rng(0)
+    matrix = np.full((4, len(samples)), 1000.) * rng.uniform(0.95, 1.05, (4, len(samples)))
+    for ii, t in enumerate(sample_types):
+        if t == 'blank':
+            matrix[0, ii] = 1
+            matrix[2:, ii] = 1
+        elif t == 'QC':
+            matrix[2, ii] *= 10 ** (ii % 2)
+        elif t == 'study_sample' and ii % 4:
+            matrix[3, ii] = 0
+    df = pd.DataFrame(matrix, columns=[s.name for s in samples])
+    df.insert(0, 'id_number', ['F0', 'F1', 'F2', 'F3'])
+    empCpds = [EmpiricalCompound(id='E1', list_features=['F0', 'F1'],
+                                 MS1_pseudo_Spectra=[{'id': 'F0'}, {'id': 'F1'}]),
+               EmpiricalCompound(id='E2', list_features=['F2'], MS1_pseudo_Spectra=[{'id': 'F2'}])]
+    return Experiment(id='test', feature_DataFrame=df, ordered_samples=samples, List_of_empCpds=empCpds)
+
+
+def test_filter_features():
+    experiment = _experiment(['blank', 'QC', 'QC', 'QC', 'QC'] + ['study_sample'] * 8)
+    stats = experiment.filter_features()
+    assert stats['passed'].tolist() == [True, False, False, False]
+    assert experiment.feature_DataFrame['id_number'].tolist() == ['F0']
+    assert [e.id for e in experiment.List_of_empCpds] == ['E1']
+    assert experiment.List_of_empCpds[0].list_features == ['F0']
+    assert experiment.List_of_empCpds[0].MS1_pseudo_Spectra == [{'id': 'F0'}]
+    assert 'filter_features' in experiment.provenance['preprocess_parameters']
+
+
+def test_filter_features_without_study_samples():
+    experiment = _experiment([''] * 6)
+    with pytest.raises(ValueError):
+        experiment.filter_features()
+    assert len(experiment.feature_DataFrame) == 4
+    assert len(experiment.List_of_empCpds) == 2
+
+
+def test_filter_features_without_matched_samples():
+    experiment = _experiment(['study_sample'] * 4)
+    experiment.ordered_samples = [Sample(id='other', name='other', sample_type='study_sample')]
+    with pytest.raises(ValueError):
+        experiment.filter_features()
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from metDataModel import processing
+from metDataModel.core import Experiment, Sample
+
+
+def _experiment(matrix):
+    samples = [Sample(id='S%d' %ii, name='sample_%d' %ii, sample_type='study_sample') for ii in range(matrix.shape[1])]
+    df = pd.DataFrame(matrix, columns=[s.name for s in samples])
+    df.insert(0, 'id_number', ['F%d' %ii for ii in range(matrix.shape[0])])
+    return Experiment(id='test', feature_DataFrame=df, ordered_samples=samples)
+
+
+@pytest.fixture
+def matrix():
+    return np.random.default_rng(1).lognormal(8, 1, (200, 6))
+
+
+def test_normalize_TIC_keeps_float64(matrix):
+    experiment = _experiment(matrix)
+    factors = experiment.normalize('TIC', chunk_size=4)
+    values = experiment.feature_DataFrame.iloc[:, 1:]
+    assert (values.dtypes == np.float64).all()
+    np.testing.assert_allclose(values.to_numpy(), matrix * factors, rtol=1e-12)
+    np.testing.assert_allclose(values.sum(axis=0), np.median(matrix.sum(axis=0)))
+
+
+def test_normalize_float32_stays_float32(matrix):
+    experiment = _experiment(matrix.astype(np.float32))
+    experiment.normalize('median')
+    assert (experiment.feature_DataFrame.dtypes.iloc[1:] == np.float32).all()
+
+
+def test_normalize_integer_table(matrix):
+    experiment = _experiment(matrix.round().astype(np.int64))
+    factors = experiment.normalize('median', chunk_size=4)
+    values = experiment.feature_DataFrame.iloc[:, 1:]
+    assert (values.dtypes == np.float64).all()
+    np.testing.assert_allclose(values.to_numpy(), matrix.round() * factors)
+
+
+def test_normalize_PQN_removes_dilution(matrix):
+    dilution = np.array([1, 2, 0.5, 1, 3, 1.5])
+    experiment = _experiment(matrix[:, :1] * dilution)
+    experiment.normalize('PQN')
+    values = experiment.feature_DataFrame.iloc[:, 1:].to_numpy()
+    np.testing.assert_allclose(values / values[:, :1], 1)
+
+
+def test_normalize_quantile_provenance(matrix):
+    experiment = _experiment(matrix)
+    reference = experiment.normalize('quantile', chunk_size=4)
+    assert reference.shape == (matrix.shape[0],)
+    values = experiment.feature_DataFrame.iloc[:, 1:].to_numpy()
+    np.testing.assert_allclose(np.sort(values, axis=0), np.repeat(np.sort(reference)[:, None], 6, axis=1))
+    assert experiment.provenance['preprocess_parameters']['normalization'] == {'method': 'quantile', 'chunk_size': 4}
+
+
+def test_chunked_matrix_rejects_integer_array():
+    with pytest.raises(TypeError):
+        processing.ChunkedMatrix(np.ones((3, 3), dtype=int))
+
+
+def test_unknown_method(matrix):
+    with pytest.raises(ValueError):
+        _experiment(matrix).normalize('total')
+
+
+@pytest.mark.parametrize('method', ['TIC', 'median', 'PQN', 'quantile'])
+def test_normalize_no_matched_samples(matrix, method):
+    experiment = _experiment(matrix)
+    experiment.ordered_samples = [Sample(id='X', name='not_a_column')]
+    with pytest.raises(ValueError, match='No sample'):
+        experiment.normalize(method)
+    assert 'normalization' not in experiment.provenance['preprocess_parameters']
+    with pytest.raises(ValueError, match='No sample'):
+        experiment.normalize(method, matrix=matrix, columns=[])
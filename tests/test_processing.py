@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from metDataModel import processing, synthetic
+
+
+def _median_QC_cv(experiment):
+    QC = experiment.get_QC_view().astype(float)
+    QC = QC[(QC > 0).all(axis=1)]
+    return np.median(QC.std(axis=1, ddof=1) / QC.mean(axis=1))
+
+
+def test_correct_drift_synthetic_float32():
+    experiment, _ = synthetic.generate_experiment(number_features=1000, number_samples=40)
+    assert experiment.feature_DataFrame.iloc[:, 3].dtype == np.float32
+    before = _median_QC_cv(experiment)
+    number_QC = experiment.correct_drift()
+    assert number_QC == {'batch_1': 4}
+    assert (experiment.feature_DataFrame.dtypes.iloc[3:] == np.float32).all()
+    after = _median_QC_cv(experiment)
+    # drift is reduced, but QC values are smoothed, not interpolated
+    assert 0.01 < after < before
+
+
+def test_loess_smoother_few_points_smooths():
+    x = np.array([3., 13., 23., 33.])
+    S = processing.loess_smoother_matrix(x, x, frac=0.75)
+    assert not np.allclose(S, np.eye(4))
+    # each local fit uses at least 3 points
+    assert ((np.abs(S) > 1e-3).sum(axis=1) >= 3).all()
+    # linear trends are reproduced by local linear regression
+    np.testing.assert_allclose(S @ (2 * x + 1), 2 * x + 1)
+    y = np.array([1., 5., 1., 5.])
+    assert np.ptp(S @ y) < np.ptp(y)
+
+
+def test_correct_drift_requires_min_QC():
+    matrix = processing.ChunkedMatrix(np.ones((3, 4)))
+    with pytest.raises(ValueError):
+        processing.correct_drift(matrix, np.arange(4), np.ones(4, dtype=bool), np.zeros(4), min_QC=3)
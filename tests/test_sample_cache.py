@@ -0,0 +1,61 @@
+import pickle
+
+import pytest
+
+from metDataModel.core import Experiment, Sample, MassTrack
+
+
+@pytest.fixture
+def samples(tmp_path):
+    samples = []
+    for ii in range(3):
+        location = tmp_path / ('sample_%d.pickle' %ii)
+        with open(location, 'wb') as O:
+            pickle.dump({'list_mass_tracks': [
+                {'id_number': jj, 'mz': 100.0 + jj, 'intensity': [1.0] * 1000} for jj in range(5)
+            ]}, O)
+        samples.append(Sample(id='S%d' %ii, data_location=str(location)))
+    return samples
+
+
+def test_experiment_cache_without_back_reference(samples):
+    experiment = Experiment(id='E1', ordered_samples=samples)
+    cache = experiment.get_sample_cache()
+    assert all(s.get_sample_cache() is cache for s in samples)
+    assert isinstance(samples[0].list_MassTracks[0], MassTrack)
+    assert id(samples[0]) in cache.entries
+    # samples do not reference the Experiment, so serialization does not recurse
+    assert 'ordered_samples' in experiment.serialize()
+    assert '_sample_cache' not in samples[0].serialize()
+
+
+def test_corrected_retention_time_kept_after_eviction(samples):
+    experiment = Experiment(id='E1', ordered_samples=samples)
+    experiment.set_sample_cache_size(1)
+    sample = samples[0]
+    for track in sample.list_MassTracks:
+        track.list_retention_time = [1.0, 2.0, 3.0]
+    sample.correct_retention_time([1.0, 3.0], [2.0, 4.0])
+    for other in samples[1:]:
+        other.list_MassTracks
+    assert id(sample) not in experiment.get_sample_cache().entries
+    assert sample.list_MassTracks[0].list_retention_time_corrected == [2.0, 3.0, 4.0]
+    serialized = sample.serialize()
+    assert serialized['list_MassTracks'][0]['list_retention_time_corrected'] == [2.0, 3.0, 4.0]
+
+
+def test_sample_without_data_location():
+    sample = Sample(id='S1')
+    assert sample.list_peaks == [] and sample.list_MassTracks == []
+    assert sample.serialize()['list_MassTracks'] == []
+
+
+def test_repr_and_eq_do_not_load(tmp_path):
+    missing = str(tmp_path / 'missing.pickle')
+    sample, other = Sample(id='S1', data_location=missing), Sample(id='S1', data_location=missing)
+    assert 'list_MassTracks=<not loaded>' in repr(sample)
+    assert sample == other
+    assert repr(Experiment(id='E1', ordered_samples=[sample]))
+    assert sample.get_sample_cache().entries.get(id(sample)) is None
+    assert Sample(id='S1', list_peaks=['P1']) != Sample(id='S1')
+    assert Sample(id='S1', list_peaks=['P1']) == Sample(id='S1', list_peaks=['P1'])
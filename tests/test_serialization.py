@@ -0,0 +1,66 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+from metDataModel import synthetic
+from metDataModel.core import metDataMember, Feature, Peak, JSON_BACKEND
+
+
+@pytest.fixture(scope='module')
+def generated():
+    experiment, features = synthetic.generate_experiment(200, 5, 50, number_masstracks=2, number_spectra=5, seed=3)
+    for sample in experiment.ordered_samples:
+        sample.experiment = experiment.id
+    return experiment, features
+
+
+@pytest.fixture(scope='module')
+def experiment(generated):
+    return generated[0]
+
+
+def test_generated_features_not_serialized(generated):
+    experiment, features = generated
+    assert len(features) == 200
+    assert 'list_features' not in experiment.serialize()
+
+
+@pytest.mark.parametrize('backend', sorted({'json', JSON_BACKEND}))
+def test_dump_matches_serialize(experiment, backend):
+    buffer = io.StringIO()
+    experiment.dump(buffer, backend)
+    assert json.loads(buffer.getvalue()) == json.loads(json.dumps(experiment.serialize()))
+    buffer.seek(0)
+    assert metDataMember.load(buffer, backend).serialize() == experiment.serialize()
+
+
+@pytest.mark.parametrize('backend', sorted({'json', JSON_BACKEND}))
+def test_dump_numpy_values(backend):
+    # numpy float64 passes as float, e.g. values read from feature_DataFrame
+    peak = Peak(id='P1', mz=np.float64(100.5), list_intensity=list(np.array([1.5, 2.5])))
+    feature = Feature(id='F1', mz=np.float64(100.5), statistics={'CV_QC': np.float64(0.1)}, list_peaks=[peak])
+    buffer = io.StringIO()
+    feature.dump(buffer, backend)
+    assert json.loads(buffer.getvalue()) == json.loads(json.dumps(feature.serialize()))
+    assert json.loads(buffer.getvalue())['list_peaks'][0]['list_intensity'] == [1.5, 2.5]
+
+
+def test_dump_preserve_references():
+    peak = Peak(id='P1')
+    feature = Feature(id='F1', list_peaks=[peak, peak], including_peaks=[peak])
+    buffer = io.StringIO()
+    feature.dump(buffer, preserve_references=True)
+    assert json.loads(buffer.getvalue()) == feature.serialize_graph()
+    buffer.seek(0)
+    loaded = metDataMember.load(buffer)
+    assert loaded.list_peaks[0] is loaded.list_peaks[1] is loaded.including_peaks[0]
+
+
+def test_bulk_dump(generated):
+    features = generated[1]
+    buffer = io.StringIO()
+    metDataMember.bulk_dump(iter(features), buffer)
+    buffer.seek(0)
+    assert [f.serialize() for f in metDataMember.load(buffer)] == [f.serialize() for f in features]
@@ -0,0 +1,31 @@
+import io
+import json
+
+import pytest
+import yaml
+
+from metDataModel.util import iter_json_tokens, stream_json_to_yaml
+
+
+def test_stream_json_to_yaml_round_trip(tmp_path):
+    data = [{'id': 'F1', 'mz': 100.5, 'rtime': 30, 'list_peaks': [], 'annotation': {}, 'flag': True, 'note': None,
+             'text': 'true', 'number_text': '1.0', 'nested': [[1, 2], {'a': [{'b': 'c, d: e'}]}]}] * 3
+    jfile, yfile = tmp_path / 'data.json', tmp_path / 'data.yaml'
+    jfile.write_text(json.dumps(data))
+    stream_json_to_yaml(str(jfile), str(yfile))
+    with open(jfile) as J, open(yfile) as Y:
+        assert yaml.safe_load(Y) == json.load(J)
+
+
+def test_tokens_across_buffers():
+    text = json.dumps({'key': ['a' * 100, -1.5e-3, {'x': None}], 'empty': {}})
+    small = list(iter_json_tokens(io.StringIO(text), buffer_size=7))
+    assert small == list(iter_json_tokens(io.StringIO(text)))
+    assert small[:3] == [('{', None), ('key', 'key'), ('[', None)]
+
+
+@pytest.mark.parametrize('text', ['{"a" 1 2 3}', ']', '[1,]', '[1 2]', '{"a":}', '{"a":1,}', '{1: 2}',
+                                  '{"a"::1}', '[}', '{"a": 1', '1 2', '"abc', '[tru]'])
+def test_malformed_JSON(text):
+    with pytest.raises(ValueError, match='position'):
+        list(iter_json_tokens(io.StringIO(text)))